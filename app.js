@@ -7,8 +7,16 @@ const apiKeyInput = document.getElementById("apiKeyInput");
 const saveKeyBtn = document.getElementById("saveKeyBtn");
 const userTpl = document.getElementById("userMessageTemplate");
 const botTpl = document.getElementById("botMessageTemplate");
+const suggestionList = document.getElementById("suggestionList");
 
 const API_KEY_SESSION_KEY = "nusus_user_openai_api_key";
+const SUGGEST_DEBOUNCE_MS = 150;
+const SUGGEST_LIMIT = 6;
+
+let suggestTimer = null;
+let suggestController = null;
+let suggestions = [];
+let activeSuggestion = -1;
 
 function detectDir(text) {
   const arabicRegex = /[\u0600-\u06FF]/;
@@ -162,8 +170,100 @@ async function askBackend(question) {
   return data;
 }
 
+function hideSuggestions() {
+  suggestions = [];
+  activeSuggestion = -1;
+  suggestionList.hidden = true;
+  suggestionList.innerHTML = "";
+}
+
+function renderSuggestions(payload) {
+  suggestions = [
+    ...(payload.terms || []).map((item) => ({ kind: "term", value: item.term, meta: `${item.docs}` })),
+    ...(payload.books || []).map((item) => ({ kind: "book", value: item.title_ar, meta: item.author_ar })),
+  ];
+  activeSuggestion = -1;
+  suggestionList.innerHTML = "";
+  if (!suggestions.length) {
+    suggestionList.hidden = true;
+    return;
+  }
+
+  suggestions.forEach((item, idx) => {
+    const li = document.createElement("li");
+    li.setAttribute("role", "option");
+    li.dir = "rtl";
+    const value = document.createElement("span");
+    value.textContent = item.value;
+    const meta = document.createElement("span");
+    meta.className = "suggestion-meta";
+    meta.textContent = item.meta;
+    li.append(value, meta);
+    // mousedown instead of click, so the textarea keeps focus.
+    li.addEventListener("mousedown", (event) => {
+      event.preventDefault();
+      applySuggestion(idx);
+    });
+    suggestionList.append(li);
+  });
+  suggestionList.hidden = false;
+}
+
+function highlightSuggestion(idx) {
+  activeSuggestion = idx;
+  suggestionList.querySelectorAll("li").forEach((li, i) => {
+    li.setAttribute("aria-selected", i === idx ? "true" : "false");
+  });
+}
+
+function applySuggestion(idx) {
+  const item = suggestions[idx];
+  if (!item) return;
+  if (item.kind === "book") {
+    questionInput.value = item.value;
+  } else {
+    // Terms complete the word being typed; book titles replace the whole input.
+    const text = questionInput.value;
+    const start = text.search(/\S+$/);
+    questionInput.value = `${start >= 0 ? text.slice(0, start) : text}${item.value} `;
+  }
+  hideSuggestions();
+  normalizeTextAreaHeight();
+  questionInput.focus();
+}
+
+async function fetchSuggestions(text) {
+  suggestController?.abort();
+  suggestController = new AbortController();
+  try {
+    const params = new URLSearchParams({ q: text, limit: String(SUGGEST_LIMIT) });
+    const response = await fetch(`/api/suggest?${params}`, { signal: suggestController.signal });
+    if (!response.ok) {
+      hideSuggestions();
+      return;
+    }
+    renderSuggestions(await response.json());
+  } catch (error) {
+    if (error.name !== "AbortError") hideSuggestions();
+  }
+}
+
+function scheduleSuggestions() {
+  clearTimeout(suggestTimer);
+  const text = questionInput.value;
+  if (!text.trim() || /\s$/.test(text)) {
+    suggestController?.abort();
+    hideSuggestions();
+    return;
+  }
+  suggestTimer = setTimeout(() => fetchSuggestions(text.trim()), SUGGEST_DEBOUNCE_MS);
+}
+
 chatForm.addEventListener("submit", async (event) => {
   event.preventDefault();
+  clearTimeout(suggestTimer);
+  suggestController?.abort();
+  hideSuggestions();
   const question = questionInput.value.trim();
   if (!question) return;
 
@@ -193,7 +293,25 @@ apiKeyInput.addEventListener("keydown", (event) => {
   }
 });
 
-questionInput.addEventListener("input", normalizeTextAreaHeight);
+questionInput.addEventListener("input", () => {
+  normalizeTextAreaHeight();
+  scheduleSuggestions();
+});
+questionInput.addEventListener("keydown", (event) => {
+  if (suggestionList.hidden) return;
+  if (event.key === "ArrowDown" || event.key === "ArrowUp") {
+    event.preventDefault();
+    const step = event.key === "ArrowDown" ? 1 : -1;
+    const start = activeSuggestion < 0 && step < 0 ? 0 : activeSuggestion;
+    highlightSuggestion((start + step + suggestions.length) % suggestions.length);
+  } else if (event.key === "Enter" && activeSuggestion >= 0) {
+    event.preventDefault();
+    applySuggestion(activeSuggestion);
+  } else if (event.key === "Escape") {
+    hideSuggestions();
+  }
+});
+questionInput.addEventListener("blur", hideSuggestions);
 
 clearChatBtn.addEventListener("click", () => {
   chatWindow.innerHTML = `
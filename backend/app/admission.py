@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy; please retry shortly.")
+        self.retry_after = retry_after
+
+
+class Deadline:
+    """Absolute per-request time budget, passed down through the pipeline."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def allows(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+
+class AdmissionController:
+    """Cap concurrent chat requests and bound the number waiting for a slot.
+
+    Requests beyond the queue, or still queued when their deadline passes,
+    are shed instead of piling up behind slow LLM calls.
+    """
+
+    def __init__(self, max_active: int, max_queued: int, retry_after: int):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        self._admitted = 0
+        self._shed = 0
+
+    @contextmanager
+    def admit(self, deadline: Deadline) -> Iterator[None]:
+        with self._cond:
+            if self._active >= self.max_active:
+                if self._queued >= self.max_queued:
+                    self._shed += 1
+                    raise Overloaded(self.retry_after)
+                self._queued += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._active < self.max_active, timeout=deadline.remaining())
+                finally:
+                    self._queued -= 1
+                if not admitted:
+                    self._shed += 1
+                    raise Overloaded(self.retry_after)
+            self._active += 1
+            self._admitted += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def under_pressure(self) -> bool:
+        """True while requests are waiting for a slot."""
+        return self._queued > 0
+
+    def snapshot(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "admission_active": self._active,
+                "admission_queue_depth": self._queued,
+                "admission_admitted": self._admitted,
+                "admission_shed": self._shed,
+            }
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class SharedCache:
+    """Key/value cache stored in a WAL-mode sqlite file.
+
+    Every uvicorn worker opens the same file, so a translation or answer computed
+    by one process is a hit for all of them. Cache failures never fail a request.
+    """
+
+    _PURGE_EVERY = 200
+
+    def __init__(self, path: Path, ttl_seconds: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+    @staticmethod
+    def make_key(*parts: object) -> str:
+        raw = "\x1f".join(str(part) for part in parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> str | None:
+        if self.ttl_seconds <= 0:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, now + self.ttl_seconds),
+            )
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error:
+            return
@@ -14,6 +14,7 @@ load_dotenv()
 class Settings:
     repo_root: Path
     db_path: Path
+    db_shards: int
     openai_api_key: str
     openai_model: str
     local_only: bool
@@ -21,17 +22,50 @@ class Settings:
     max_retrieval_candidates: int
     default_top_k: int
     default_max_opinions: int
+    sqlite_mmap_bytes: int
+    warmup_mode: str
+    warmup_vocab_terms: int
+    cache_path: Path | None
+    cache_ttl_seconds: int
+    fast_json: bool
+    coalesce_requests: bool
+    coalesce_across_keys: bool
+    max_active_chats: int
+    max_queued_chats: int
+    request_timeout_seconds: float
+    llm_min_budget_seconds: float
+    retry_after_seconds: int
+    extractive_under_load: bool
+    suggest_max_terms: int
+    suggest_min_docs: int
+    slow_log_ms: float
+    slow_log_size: int
+    slow_log_path: Path | None
+    profile_interval_ms: float
+
+
+def _resolve_path(repo_root: Path, value: str) -> Path:
+    path = Path(value)
+    if not path.is_absolute():
+        path = (repo_root / path).resolve()
+    return path
+
+
+def _warmup_mode(value: str) -> str:
+    mode = {"0": "off", "1": "sync"}.get(value.strip(), value.strip().lower())
+    return mode if mode in {"off", "sync", "background"} else "background"
 
 
 def get_settings() -> Settings:
     repo_root = Path(__file__).resolve().parents[2]
-    db_path = Path(os.getenv("NUSUS_DB_PATH", "./data/corpus.sqlite"))
-    if not db_path.is_absolute():
-        db_path = (repo_root / db_path).resolve()
+    db_path = _resolve_path(repo_root, os.getenv("NUSUS_DB_PATH", "./data/corpus.sqlite"))
+    cache_path_value = os.getenv("NUSUS_CACHE_PATH", "./data/cache.sqlite").strip()
+    slow_log_path_value = os.getenv("NUSUS_SLOW_LOG_PATH", "").strip()
 
     return Settings(
         repo_root=repo_root,
         db_path=db_path,
+        db_shards=max(1, int(os.getenv("NUSUS_DB_SHARDS", "1"))),
         openai_api_key=os.getenv("OPENAI_API_KEY", ""),
         openai_model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
         local_only=os.getenv("LOCAL_ONLY_MODE", "1") == "1",
@@ -39,4 +73,24 @@ def get_settings() -> Settings:
         max_retrieval_candidates=max(5, int(os.getenv("MAX_RETRIEVAL_CANDIDATES", "30"))),
         default_top_k=max(3, int(os.getenv("DEFAULT_TOP_K", "12"))),
         default_max_opinions=max(2, int(os.getenv("DEFAULT_MAX_OPINIONS", "4"))),
+        sqlite_mmap_bytes=max(0, int(os.getenv("NUSUS_SQLITE_MMAP_BYTES", str(1024 * 1024 * 1024)))),
+        warmup_mode=_warmup_mode(os.getenv("NUSUS_WARMUP", "background")),
+        warmup_vocab_terms=max(0, int(os.getenv("NUSUS_WARMUP_VOCAB_TERMS", "500"))),
+        cache_path=_resolve_path(repo_root, cache_path_value) if cache_path_value else None,
+        cache_ttl_seconds=max(0, int(os.getenv("NUSUS_CACHE_TTL_SECONDS", "86400"))),
+        fast_json=os.getenv("NUSUS_FAST_JSON", "1") == "1",
+        coalesce_requests=os.getenv("NUSUS_COALESCE", "1") == "1",
+        coalesce_across_keys=os.getenv("NUSUS_COALESCE_ACROSS_KEYS", "0") == "1",
+        max_active_chats=max(1, int(os.getenv("NUSUS_MAX_ACTIVE_CHATS", "16"))),
+        max_queued_chats=max(0, int(os.getenv("NUSUS_MAX_QUEUED_CHATS", "16"))),
+        request_timeout_seconds=max(1.0, float(os.getenv("NUSUS_REQUEST_TIMEOUT_SECONDS", "30"))),
+        llm_min_budget_seconds=max(0.0, float(os.getenv("NUSUS_LLM_MIN_BUDGET_SECONDS", "5"))),
+        retry_after_seconds=max(1, int(os.getenv("NUSUS_RETRY_AFTER_SECONDS", "2"))),
+        extractive_under_load=os.getenv("NUSUS_EXTRACTIVE_UNDER_LOAD", "1") == "1",
+        suggest_max_terms=max(0, int(os.getenv("NUSUS_SUGGEST_MAX_TERMS", "200000"))),
+        suggest_min_docs=max(1, int(os.getenv("NUSUS_SUGGEST_MIN_DOCS", "2"))),
+        slow_log_ms=max(0.0, float(os.getenv("NUSUS_SLOW_LOG_MS", "0"))),
+        slow_log_size=max(1, int(os.getenv("NUSUS_SLOW_LOG_SIZE", "200"))),
+        slow_log_path=_resolve_path(repo_root, slow_log_path_value) if slow_log_path_value else None,
+        profile_interval_ms=max(1.0, float(os.getenv("NUSUS_PROFILE_INTERVAL_MS", "5"))),
     )
@@ -1,26 +1,45 @@
 from __future__ import annotations
 
 import json
-from typing import Any
-
-from openai import OpenAI
+from typing import TYPE_CHECKING, Any
 
 from .config import Settings
 from .retrieval import Passage
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 
 class LLMClient:
+    """OpenAI wrapper; the `openai` package is imported on first use, not at startup."""
+
     def __init__(self, settings: Settings):
         self.default_api_key = settings.openai_api_key
         self.model = settings.openai_model
+        self._default_client: OpenAI | None = None
+
+    def warm_up(self) -> None:
+        self._client(None)
 
     def _client(self, api_key: str | None) -> OpenAI | None:
         key = (api_key or self.default_api_key or "").strip()
         if not key:
             return None
-        return OpenAI(api_key=key)
 
-    def translate_to_arabic(self, text: str, api_key: str | None = None) -> str | None:
+        from openai import OpenAI
+
+        if key != self.default_api_key:
+            return OpenAI(api_key=key)
+        if self._default_client is None:
+            self._default_client = OpenAI(api_key=key)
+        return self._default_client
+
+    @staticmethod
+    def _bounded(client: OpenAI, timeout: float | None) -> OpenAI:
+        """With a deadline, make one attempt only: SDK retries would run past the remaining budget."""
+        return client if timeout is None else client.with_options(max_retries=0)
+
+    def translate_to_arabic(self, text: str, api_key: str | None = None, timeout: float | None = None) -> str | None:
         client = self._client(api_key)
         if not client:
             return None
@@ -33,7 +52,9 @@ class LLMClient:
             {"role": "user", "content": text},
         ]
         try:
-            response = client.chat.completions.create(model=self.model, messages=messages, temperature=0)
+            response = self._bounded(client, timeout).chat.completions.create(
+                model=self.model, messages=messages, temperature=0, timeout=timeout
+            )
             translated = (response.choices[0].message.content or "").strip()
             return translated or None
         except Exception:
@@ -46,6 +67,7 @@ class LLMClient:
         passages: list[Passage],
         max_opinions: int,
         api_key: str | None = None,
+        timeout: float | None = None,
     ) -> dict[str, Any] | None:
         client = self._client(api_key)
         if not client:
@@ -88,10 +110,11 @@ class LLMClient:
         )
 
         try:
-            response = client.chat.completions.create(
+            response = self._bounded(client, timeout).chat.completions.create(
                 model=self.model,
                 temperature=0.2,
                 response_format={"type": "json_object"},
+                timeout=timeout,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
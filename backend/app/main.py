@@ -1,21 +1,69 @@
 from __future__ import annotations
 
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
 from ipaddress import ip_address
 from pathlib import Path
+from typing import Any
 
-from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
 
+from .admission import Deadline, Overloaded
 from .config import get_settings
-from .models import ChatRequest, ChatResponse
+from .models import ChatRequest, ChatResponse, SuggestResponse
+from .retrieval import SearchFilters, shard_paths
 from .service import ChatService
+from .slowlog import RequestTrace, SamplingProfiler, SlowLog
 
 settings = get_settings()
-service = ChatService(settings)
+slow_log = SlowLog(settings.slow_log_ms, capacity=settings.slow_log_size, path=settings.slow_log_path)
 
-app = FastAPI(title="Nusus AI", version="0.1.0")
+_service: ChatService | None = None
+_service_lock = threading.Lock()
+_warmup_done = threading.Event()
+
+
+def get_service() -> ChatService:
+    """Build the chat service on first use instead of at import time."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ChatService(settings)
+    return _service
+
+
+def _warm_up() -> None:
+    try:
+        stats = get_service().warm_up()
+        print(
+            f"[Nusus AI] Index warm-up: {stats['segment_blocks']} FTS blocks "
+            f"({stats['segment_bytes'] // 1024} KiB), {stats['hot_terms']} hot terms, "
+            f"{stats['suggest_terms']} suggestion terms."
+        )
+    except Exception as exc:
+        print(f"[Nusus AI] Index warm-up skipped: {exc}")
+    finally:
+        _warmup_done.set()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if settings.warmup_mode == "sync":
+        _warm_up()
+    elif settings.warmup_mode == "background":
+        threading.Thread(target=_warm_up, name="nusus-warmup", daemon=True).start()
+    else:
+        _warmup_done.set()
+    yield
+
+
+app = FastAPI(title="Nusus AI", version="0.1.0", lifespan=lifespan)
 
 if settings.public_launch_reminder:
     print(
@@ -31,6 +79,19 @@ app.add_middleware(
 )
 
 
+class ModelJSONResponse(JSONResponse):
+    """Render a pydantic model with its compiled serializer.
+
+    Returning a Response bypasses FastAPI's response_model handling, which would
+    dump, re-validate and re-encode a model the service has already built.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return super().render(content)
+
+
 def _is_local_client(host: str | None) -> bool:
     if not host:
         return False
@@ -47,36 +108,126 @@ def health() -> dict[str, str]:
     return {
         "status": "ok",
         "db_path": str(settings.db_path),
+        "db_shards": str(settings.db_shards),
         "server_key_enabled": "yes" if bool(settings.openai_api_key) else "no",
         "local_only_mode": "yes" if settings.local_only else "no",
         "public_launch_reminder": "yes" if settings.public_launch_reminder else "no",
     }
 
 
+@app.get("/api/ready")
+def ready() -> dict[str, str]:
+    for path in shard_paths(settings.db_path, settings.db_shards):
+        if not path.exists():
+            raise HTTPException(status_code=503, detail=f"Corpus DB not found at: {path}")
+    if not _warmup_done.is_set():
+        raise HTTPException(status_code=503, detail="Warming up.")
+    get_service()
+    return {"status": "ready"}
+
+
+@app.get("/api/metrics")
+def metrics(request: Request) -> dict[str, int]:
+    if not _is_local_client(request.client.host if request.client else None):
+        raise HTTPException(status_code=403, detail="Metrics are only available locally.")
+    return get_service().metrics_snapshot()
+
+
+@app.get("/api/admin/slow")
+def slow_requests(request: Request, limit: int = Query(default=50, ge=1, le=1000)) -> dict[str, Any]:
+    if not _is_local_client(request.client.host if request.client else None):
+        raise HTTPException(status_code=403, detail="Admin endpoints are only available locally.")
+    return {"threshold_ms": slow_log.threshold_ms, "entries": slow_log.entries(limit)}
+
+
+def _finish_trace(trace: RequestTrace, status: int, profiler: SamplingProfiler | None) -> None:
+    """Keep the trace if the request was slow or profiled, adding the search query plan."""
+    profile = profiler.stop() if profiler else None
+    if profile is None and not slow_log.is_slow(trace):
+        return
+
+    entry = trace.to_dict()
+    entry["status"] = status
+    expression = trace.fields.get("match_expression")
+    if expression:
+        try:
+            entry["query_plan"] = get_service().retriever.explain(expression, trace.fields.get("search_limit", 12))
+        except (sqlite3.Error, FileNotFoundError) as exc:
+            entry["query_plan"] = [f"unavailable: {exc}"]
+    if profile is not None:
+        entry["profile"] = profile
+    slow_log.record(entry)
+
+
 @app.post("/api/chat", response_model=ChatResponse)
 def chat(
     payload: ChatRequest,
     request: Request,
     x_openai_api_key: str | None = Header(default=None),
-) -> ChatResponse:
+    x_nusus_profile: str | None = Header(default=None),
+) -> ChatResponse | Response:
     question = payload.question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question is required.")
-    if settings.local_only and not _is_local_client(request.client.host if request.client else None):
+    is_local = _is_local_client(request.client.host if request.client else None)
+    if settings.local_only and not is_local:
         raise HTTPException(status_code=403, detail="Local-only mode is enabled.")
 
+    trace = RequestTrace()
+    profiler = None
+    if x_nusus_profile == "1" and is_local:
+        profiler = SamplingProfiler(threading.get_ident(), interval=settings.profile_interval_ms / 1000).start()
+    status = 500
+    deadline = Deadline(settings.request_timeout_seconds)
     try:
-        return service.answer(
+        response = get_service().answer(
             question=question,
             top_k=payload.top_k,
             max_opinions=payload.max_opinions,
             user_openai_api_key=x_openai_api_key,
+            filters=SearchFilters(author=payload.author, book=payload.book, madhhab=payload.madhhab),
+            deadline=deadline,
+            trace=trace,
         )
+        status = 200
+        if settings.fast_json:
+            with trace.stage("serialize"):
+                return ModelJSONResponse(response)
+        return response
+    except Overloaded as exc:
+        status = 503
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Server error: {exc}") from exc
+    finally:
+        _finish_trace(trace, status, profiler)
+
+
+@app.get("/api/suggest", response_model=SuggestResponse)
+def suggest(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=8, ge=1, le=20),
+) -> SuggestResponse | Response:
+    if settings.local_only and not _is_local_client(request.client.host if request.client else None):
+        raise HTTPException(status_code=403, detail="Local-only mode is enabled.")
+    try:
+        response = get_service().suggest(q, limit)
     except FileNotFoundError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Server error: {exc}") from exc
 
+    if settings.fast_json:
+        return ModelJSONResponse(response)
+    return response
+
 
 frontend_root = Path(__file__).resolve().parents[2]
 index_file = frontend_root / "index.html"
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+
+
+class Metrics:
+    """Thread-safe process-local counters exposed at /api/metrics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Counter[str] = Counter()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += value
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
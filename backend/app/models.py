@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ChatRequest(BaseModel):
     question: str = Field(min_length=1, max_length=6000)
     top_k: int | None = Field(default=None, ge=3, le=30)
     max_opinions: int | None = Field(default=None, ge=2, le=8)
+    author: str | None = Field(default=None, max_length=200)
+    book: str | None = Field(default=None, max_length=200)
+    madhhab: str | None = Field(default=None, max_length=100)
 
 
 class Citation(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     book_title_ar: str
     author_ar: str
@@ -18,6 +23,8 @@ class Citation(BaseModel):
     page: str | None = None
     snippet_ar: str
     score: float
+    char_start: int | None = None
+    char_end: int | None = None
 
 
 class Opinion(BaseModel):
@@ -32,3 +39,18 @@ class ChatResponse(BaseModel):
     opinions: list[Opinion]
     citations: list[Citation]
     notes: list[str] = Field(default_factory=list)
+
+
+class TermSuggestion(BaseModel):
+    term: str
+    docs: int
+
+
+class BookSuggestion(BaseModel):
+    title_ar: str
+    author_ar: str
+
+
+class SuggestResponse(BaseModel):
+    terms: list[TermSuggestion]
+    books: list[BookSuggestion]
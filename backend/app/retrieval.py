@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import heapq
 import re
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
 
-@dataclass
+@dataclass(slots=True)
 class Passage:
     id: str
     book_title_ar: str
@@ -16,81 +19,290 @@ class Passage:
     page: str | None
     snippet_ar: str
     score: float
+    book_id: int = 0
+    char_start: int | None = None
+    char_end: int | None = None
+    # Compressed text of zstd indexes; CorpusRetriever.hydrate fills snippet_ar from it.
+    text_zst: bytes | None = None
+    shard: int = 0
 
 
 _MATCH_CLEANER = re.compile(r"[^\w\s\u0600-\u06FF]+", flags=re.UNICODE)
 _WHITESPACE = re.compile(r"\s+")
 
+SNIPPET_CHARS = 400
+
+_SEARCH_SQL = """
+SELECT
+    p.id,
+    p.book_id,
+    b.title_ar AS book_title_ar,
+    a.name_ar AS author_ar,
+    p.volume,
+    p.page,
+    p.char_start,
+    p.char_end,
+    substr(p.text_ar, 1, ?) AS snippet_ar,
+    p.text_zst,
+    bm25(passages_fts) AS score
+FROM passages_fts
+JOIN passages p ON p.pk = passages_fts.rowid
+JOIN books b ON b.id = p.book_id
+JOIN authors a ON a.id = b.author_id
+WHERE passages_fts MATCH ?
+ORDER BY score ASC
+LIMIT ?
+"""
+
 
 def normalize_for_match(text: str) -> str:
     cleaned = _MATCH_CLEANER.sub(" ", text).strip()
     return _WHITESPACE.sub(" ", cleaned)
 
 
+@dataclass(frozen=True)
+class SearchFilters:
+    author: str | None = None
+    book: str | None = None
+    madhhab: str | None = None
+
+    def match_clauses(self) -> list[str]:
+        """FTS5 column filters, so narrowing happens inside the index rather than after the fetch."""
+        clauses = []
+        for column, value in (("author_ar", self.author), ("book_title_ar", self.book), ("madhhab_ar", self.madhhab)):
+            phrase = normalize_for_match(value or "")
+            if phrase:
+                clauses.append(f'{column} : "{phrase}"')
+        return clauses
+
+
+# madhhab_ar is left out: a school name in a question would otherwise match every passage
+# of that school. It is searched only through SearchFilters.madhhab.
+_FREE_TEXT_COLUMNS = "{text_ar book_title_ar author_ar}"
+
+
+def build_match_expression(normalized: str, filters: SearchFilters | None = None) -> str:
+    clauses = filters.match_clauses() if filters else []
+    return " AND ".join([f"{_FREE_TEXT_COLUMNS} : ({normalized})", *clauses])
+
+
+def format_source_ref(book_title_ar: str, volume: str | None, page: str | None) -> str:
+    source_ref = book_title_ar
+    if volume:
+        source_ref += f"، ج{volume}"
+    if page:
+        source_ref += f"، ص{page}"
+    return source_ref
+
+
+def shard_paths(db_path: Path, shards: int = 1) -> list[Path]:
+    """Return the index files for a corpus; shard names match scripts/build_sqlite_from_jsonl.py."""
+    if shards <= 1:
+        return [db_path]
+    return [db_path.with_name(f"{db_path.stem}-{i:03d}-of-{shards:03d}{db_path.suffix}") for i in range(shards)]
+
+
 class CorpusRetriever:
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, mmap_bytes: int = 0, shards: int = 1):
         self.db_path = db_path
+        self.mmap_bytes = mmap_bytes
+        self.paths = shard_paths(db_path, shards)
+        self._local = threading.local()
+        self._zstd_dicts: dict[Path, bytes] = {}
+        # SQLite releases the GIL while a statement runs, so shards are searched in parallel threads.
+        self._pool = (
+            ThreadPoolExecutor(max_workers=len(self.paths), thread_name_prefix="nusus-shard")
+            if len(self.paths) > 1
+            else None
+        )
+
+    def _connect(self, path: Path | None = None) -> sqlite3.Connection:
+        """Return this thread's read-only connection to one index file, opening it on first use.
 
-    def _connect(self) -> sqlite3.Connection:
-        if not self.db_path.exists():
-            raise FileNotFoundError(f"Corpus DB not found at: {self.db_path}")
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
+        The index is opened read-only and memory-mapped, so every worker process
+        reads the same file pages from the OS page cache instead of keeping its
+        own copy in the SQLite page cache.
+        """
+        path = path or self.paths[0]
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(path)
+        if conn is not None:
+            return conn
+
+        if not path.exists():
+            raise FileNotFoundError(f"Corpus DB not found at: {path}")
+        conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        if self.mmap_bytes > 0:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+        meta = dict(conn.execute("SELECT key, value FROM index_meta").fetchall())
+        if meta.get("text_codec") == "zstd":
+            self._zstd_dicts[path] = meta["zstd_dict"]
+        conns[path] = conn
         return conn
 
-    def search(self, query: str, limit: int = 12) -> list[Passage]:
+    def index_identity(self) -> str:
+        """Identify the index files currently on disk, so cached answers from an older build are not reused."""
+        parts = []
+        for path in self.paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Corpus DB not found at: {path}") from None
+            parts.append(f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}")
+        return "|".join(parts)
+
+    def _decompressor(self, path: Path):
+        """Return this thread's zstd decompressor for one index file (they are not thread-safe)."""
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(path)
+        if decompressor is None:
+            import zstandard
+
+            dict_data = zstandard.ZstdCompressionDict(self._zstd_dicts[path])
+            decompressor = decompressors[path] = zstandard.ZstdDecompressor(dict_data=dict_data)
+        return decompressor
+
+    def hydrate(self, passages: list[Passage]) -> list[Passage]:
+        """Decompress snippets of the passages that will actually be used; a no-op for plain indexes."""
+        for p in passages:
+            if p.text_zst is None:
+                continue
+            text = self._decompressor(self.paths[p.shard]).decompress(p.text_zst).decode("utf-8")
+            p.snippet_ar = text[:SNIPPET_CHARS]
+            p.text_zst = None
+        return passages
+
+    def full_texts(self, passages: list[Passage]) -> list[str]:
+        """Whole text of each passage (snippet_ar stops at SNIPPET_CHARS), read by id for just these passages."""
+        ids_by_shard: dict[int, list[str]] = {}
+        for p in passages:
+            ids_by_shard.setdefault(p.shard, []).append(p.id)
+
+        texts: dict[str, str] = {}
+        for shard, ids in ids_by_shard.items():
+            path = self.paths[shard]
+            rows = self._connect(path).execute(
+                f"SELECT id, text_ar, text_zst FROM passages WHERE id IN ({', '.join('?' * len(ids))})", ids
+            )
+            for pid, text_ar, text_zst in rows:
+                if text_zst is not None:
+                    text_ar = self._decompressor(path).decompress(text_zst).decode("utf-8")
+                texts[pid] = text_ar or ""
+        return [texts.get(p.id) or p.snippet_ar for p in passages]
+
+    def warm_up(self, vocab_terms: int = 500) -> dict[str, int]:
+        totals = {"segment_blocks": 0, "segment_bytes": 0, "hot_terms": 0}
+        for path in self.paths:
+            for key, value in self._warm_up_shard(path, vocab_terms).items():
+                totals[key] += value
+        return totals
+
+    def _warm_up_shard(self, path: Path, vocab_terms: int) -> dict[str, int]:
+        """Pre-touch FTS5 segment pages and the doclists of the most frequent terms."""
+        conn = self._connect(path)
+        blocks, segment_bytes = conn.execute(
+            "SELECT count(*), coalesce(sum(length(block)), 0) FROM passages_fts_data"
+        ).fetchone()
+        conn.execute("SELECT count(*) FROM passages_fts_idx").fetchone()
+
+        touched_terms = 0
+        if vocab_terms > 0:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.passages_vocab USING fts5vocab(main, passages_fts, 'row')")
+            terms = conn.execute(
+                "SELECT term FROM temp.passages_vocab ORDER BY doc DESC LIMIT ?",
+                (vocab_terms,),
+            ).fetchall()
+            for (term,) in terms:
+                phrase = '"' + term.replace('"', '""') + '"'
+                conn.execute("SELECT count(*) FROM passages_fts WHERE passages_fts MATCH ?", (phrase,)).fetchone()
+                touched_terms += 1
+
+        return {"segment_blocks": int(blocks), "segment_bytes": int(segment_bytes), "hot_terms": touched_terms}
+
+    def vocabulary(self, min_docs: int = 1) -> dict[str, int]:
+        """Number of passages containing each term of the text column, summed over shards."""
+        docs: dict[str, int] = {}
+        for path in self.paths:
+            conn = self._connect(path)
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS temp.passages_vocab_col USING fts5vocab(main, passages_fts, 'col')"
+            )
+            for term, doc in conn.execute("SELECT term, doc FROM temp.passages_vocab_col WHERE col = 'text_ar'"):
+                docs[term] = docs.get(term, 0) + doc
+        if min_docs <= 1:
+            return docs
+        return {term: doc for term, doc in docs.items() if doc >= min_docs}
+
+    def book_titles(self) -> list[tuple[str, str]]:
+        """(title, author) of every book; each shard stores the full catalog."""
+        rows = self._connect(self.paths[0]).execute(
+            "SELECT b.title_ar, a.name_ar FROM books AS b JOIN authors AS a ON a.id = b.author_id"
+        )
+        return [(title, author) for title, author in rows]
+
+    @staticmethod
+    def match_expression(query: str, filters: SearchFilters | None = None) -> str:
+        """The exact FTS5 MATCH string search() runs for a query; empty when nothing is searchable."""
         normalized = normalize_for_match(query)
-        if not normalized:
+        return build_match_expression(normalized, filters) if normalized else ""
+
+    def explain(self, expression: str, limit: int = 12) -> list[str]:
+        """EXPLAIN QUERY PLAN of the search SQL for one MATCH expression, on the first shard."""
+        rows = self._connect(self.paths[0]).execute(
+            "EXPLAIN QUERY PLAN " + _SEARCH_SQL, (SNIPPET_CHARS, expression, limit)
+        ).fetchall()
+        return [detail for _, _, _, detail in rows]
+
+    def search(self, query: str, limit: int = 12, filters: SearchFilters | None = None) -> list[Passage]:
+        expression = self.match_expression(query, filters)
+        if not expression:
             return []
 
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT
-                    p.id,
-                    p.book_title_ar,
-                    p.author_ar,
-                    p.source_ref_ar,
-                    p.volume,
-                    p.page,
-                    p.text_ar AS snippet_ar,
-                    bm25(passages_fts) AS score
-                FROM passages_fts
-                JOIN passages p ON p.id = passages_fts.id
-                WHERE passages_fts MATCH ?
-                ORDER BY score ASC
-                LIMIT ?
-                """,
-                (normalized, limit),
-            ).fetchall()
+        if self._pool is None:
+            return self._search_shard(0, expression, limit)
+
+        # Each shard returns its own top-k; the global top-k is the best of their union.
+        # BM25 statistics are per shard, so scores are comparable only approximately.
+        per_shard = self._pool.map(lambda shard: self._search_shard(shard, expression, limit), range(len(self.paths)))
+        return heapq.nsmallest(limit, (p for hits in per_shard for p in hits), key=lambda p: p.score)
+
+    def _search_shard(self, shard: int, expression: str, limit: int) -> list[Passage]:
+        conn = self._connect(self.paths[shard])
+        rows = conn.execute(_SEARCH_SQL, (SNIPPET_CHARS, expression, limit)).fetchall()
 
-        results: list[Passage] = []
-        for row in rows:
-            results.append(
-                Passage(
-                    id=row["id"],
-                    book_title_ar=row["book_title_ar"],
-                    author_ar=row["author_ar"],
-                    source_ref_ar=row["source_ref_ar"],
-                    volume=row["volume"],
-                    page=row["page"],
-                    snippet_ar=(row["snippet_ar"] or "")[:400],
-                    score=float(row["score"]),
-                )
+        return [
+            Passage(
+                id=pid,
+                book_title_ar=book_title_ar,
+                author_ar=author_ar,
+                source_ref_ar=format_source_ref(book_title_ar, volume, page),
+                volume=volume,
+                page=page,
+                snippet_ar=snippet_ar or "",
+                score=score,
+                book_id=book_id,
+                char_start=char_start,
+                char_end=char_end,
+                text_zst=text_zst,
+                shard=shard,
             )
-        return results
+            for pid, book_id, book_title_ar, author_ar, volume, page, char_start, char_end, snippet_ar, text_zst, score in rows
+        ]
 
 
 def pick_diverse_passages(passages: list[Passage], max_items: int, max_per_source: int = 2) -> list[Passage]:
     selected: list[Passage] = []
-    count_by_source: dict[str, int] = {}
+    count_by_book: dict[int, int] = {}
 
     for item in passages:
-        source_key = f"{item.book_title_ar}|{item.author_ar}"
-        used = count_by_source.get(source_key, 0)
+        used = count_by_book.get(item.book_id, 0)
         if used >= max_per_source:
             continue
-        count_by_source[source_key] = used + 1
+        count_by_book[item.book_id] = used + 1
         selected.append(item)
         if len(selected) >= max_items:
             break
@@ -1,22 +1,81 @@
 from __future__ import annotations
 
+import hashlib
+import time
 from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable
 
-from langdetect import DetectorFactory, LangDetectException, detect
+from pydantic import TypeAdapter
 
+from .admission import AdmissionController, Deadline, Overloaded
+from .cache import SharedCache
 from .config import Settings
 from .llm import LLMClient
-from .models import ChatResponse, Citation, Opinion
-from .retrieval import Passage, CorpusRetriever, pick_diverse_passages
+from .metrics import Metrics
+from .models import BookSuggestion, ChatResponse, Citation, Opinion, SuggestResponse, TermSuggestion
+from .retrieval import Passage, CorpusRetriever, SearchFilters, normalize_for_match, pick_diverse_passages
+from .singleflight import FlightTimeout, SingleFlight
+from .slowlog import RequestTrace
+from .suggest import Suggester
+from .summarizer import SUMMARY_CHARS, ExtractiveSummarizer
 
-DetectorFactory.seed = 0
+_CITATION_LIST = TypeAdapter(list[Citation])
+
+NO_KEY_NOTE = "No API key provided; using extractive fallback mode."
+DEADLINE_NOTE = "Answer deadline reached; using extractive fallback mode."
+LOAD_NOTE = "Server is under load; using extractive fallback mode."
+
+
+@lru_cache(maxsize=1)
+def _language_detector() -> tuple[Callable[[str], str], type[Exception]]:
+    """Import langdetect on first use; its language profiles are slow to load."""
+    from langdetect import DetectorFactory, LangDetectException, detect
+
+    DetectorFactory.seed = 0
+    return detect, LangDetectException
 
 
 class ChatService:
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.retriever = CorpusRetriever(settings.db_path)
+        self.retriever = CorpusRetriever(
+            settings.db_path,
+            mmap_bytes=settings.sqlite_mmap_bytes,
+            shards=settings.db_shards,
+        )
         self.llm = LLMClient(settings)
+        self.cache = SharedCache(settings.cache_path, settings.cache_ttl_seconds) if settings.cache_path else None
+        self.inflight: SingleFlight[tuple[ChatResponse, bool]] = SingleFlight()
+        self.metrics = Metrics()
+        self.admission = AdmissionController(
+            max_active=settings.max_active_chats,
+            max_queued=settings.max_queued_chats,
+            retry_after=settings.retry_after_seconds,
+        )
+        self.summarizer = ExtractiveSummarizer()
+        self.suggester = Suggester(
+            self.retriever,
+            max_terms=settings.suggest_max_terms,
+            min_docs=settings.suggest_min_docs,
+        )
+
+    def warm_up(self) -> dict[str, int]:
+        self.detect_language("warm up language profiles")
+        self.llm.warm_up()
+        self.summarizer.warm_up()
+        totals = self.retriever.warm_up(vocab_terms=self.settings.warmup_vocab_terms)
+        return {**totals, **self.suggester.load()}
+
+    def suggest(self, text: str, limit: int = 8) -> SuggestResponse:
+        self.metrics.incr("suggest_requests")
+        terms, books = self.suggester.suggest(text, limit)
+        return SuggestResponse(
+            terms=[TermSuggestion(term=term, docs=docs) for term, docs in terms],
+            books=[BookSuggestion(title_ar=title, author_ar=author) for title, author in books],
+        )
 
     def answer(
         self,
@@ -24,56 +83,241 @@ class ChatService:
         top_k: int | None = None,
         max_opinions: int | None = None,
         user_openai_api_key: str | None = None,
+        filters: SearchFilters | None = None,
+        deadline: Deadline | None = None,
+        trace: RequestTrace | None = None,
     ) -> ChatResponse:
+        """Answer from the cache, from an identical request already in flight, or by running the pipeline.
+
+        Only the run that computes an answer takes an admission slot; cache hits
+        and coalesced followers do not. Followers of a leader that was shed retry
+        on their own. Raises Overloaded when this caller's own run is shed.
+        """
+        trace = trace or RequestTrace()
+        deadline = deadline or Deadline(self.settings.request_timeout_seconds)
         top_k = top_k or self.settings.default_top_k
         max_opinions = max_opinions or self.settings.default_max_opinions
-        lang = self.detect_language(question)
+        filters = filters or SearchFilters()
+        key_scope = self._key_scope(user_openai_api_key)
+        self.metrics.incr("chat_requests")
+
+        request_parts = (
+            self._normalize_question(question),
+            top_k,
+            max_opinions,
+            filters.author or "",
+            filters.book or "",
+            filters.madhhab or "",
+        )
+        trace.note(question=request_parts[0], top_k=top_k, key_scope=key_scope.split(":", 1)[0])
+        cache_key = SharedCache.make_key(self.llm.model, key_scope, self.retriever.index_identity(), *request_parts)
+        if self.cache:
+            with trace.stage("cache"):
+                cached = self.cache.get("answer", cache_key)
+            if cached:
+                self.metrics.incr("cache_hits")
+                trace.note(path="cache")
+                return ChatResponse.model_validate_json(cached)
+
+        led = False
+
+        def compute() -> tuple[ChatResponse, bool]:
+            nonlocal led
+            led = True
+            with self._admitted(deadline, trace):
+                extractive_only = self.settings.extractive_under_load and self.admission.under_pressure()
+                result = self._answer_uncached(
+                    question, top_k, max_opinions, user_openai_api_key, key_scope, filters, deadline, extractive_only, trace
+                )
+            if self.cache and result[1]:
+                self.cache.set("answer", cache_key, result[0].model_dump_json())
+            return result
+
+        if not self.settings.coalesce_requests:
+            return compute()[0]
+
+        flight_key = SharedCache.make_key(self.llm.model, self._flight_scope(key_scope), *request_parts)
+        while True:
+            # Followers stop waiting while there is still time left to answer on their own.
+            wait = max(0.0, deadline.remaining() - self.settings.llm_min_budget_seconds)
+            try:
+                (response, _), shared = self.inflight.do(flight_key, compute, timeout=wait)
+            except FlightTimeout:
+                self.metrics.incr("coalesce_timeouts")
+                trace.note(coalesce="timeout")
+                with self._admitted(deadline, trace):
+                    return self._answer_uncached(
+                        question, top_k, max_opinions, user_openai_api_key, key_scope, filters, deadline, True, trace
+                    )[0]
+            except Overloaded:
+                if led:
+                    raise
+                # The leader was shed, not this caller: run or join the next flight instead.
+                self.metrics.incr("coalesce_retries")
+                continue
+            break
+
+        if shared:
+            self.metrics.incr("coalesced")
+            trace.note(path="coalesced")
+        return response
+
+    def metrics_snapshot(self) -> dict[str, int]:
+        counts = self.metrics.snapshot()
+        counts["in_flight"] = self.inflight.in_flight()
+        return {**counts, **self.admission.snapshot()}
+
+    @contextmanager
+    def _admitted(self, deadline: Deadline, trace: RequestTrace) -> Iterator[None]:
+        started = time.perf_counter()
+        with self.admission.admit(deadline):
+            trace.add("admission", (time.perf_counter() - started) * 1000)
+            yield
+
+    def _answer_uncached(
+        self,
+        question: str,
+        top_k: int,
+        max_opinions: int,
+        user_openai_api_key: str | None,
+        key_scope: str,
+        filters: SearchFilters,
+        deadline: Deadline | None = None,
+        extractive_only: bool = False,
+        trace: RequestTrace | None = None,
+    ) -> tuple[ChatResponse, bool]:
+        """Run the pipeline; the flag tells whether the result is safe to cache.
+
+        Extractive fallbacks caused by a failing LLM call, a near deadline or load
+        shedding (`extractive_only`) are not cached, so a transient condition is
+        not served to later callers.
+        """
+        trace = trace or RequestTrace()
+        with trace.stage("language"):
+            lang = self.detect_language(question)
 
         translated_query = None
-        if lang != "ar":
-            translated_query = self.llm.translate_to_arabic(question, api_key=user_openai_api_key)
+        if lang != "ar" and self._llm_allowed(deadline):
+            with trace.stage("translate"):
+                translated_query = self._translate(
+                    question, user_openai_api_key, key_scope, self._llm_timeout(deadline)
+                )
 
         search_query = translated_query or question
-        raw_hits = self.retriever.search(search_query, limit=max(self.settings.max_retrieval_candidates, top_k))
-        selected = pick_diverse_passages(raw_hits, max_items=top_k)
+        limit = max(self.settings.max_retrieval_candidates, top_k)
+        trace.note(
+            language=lang,
+            search_query=normalize_for_match(search_query),
+            match_expression=self.retriever.match_expression(search_query, filters),
+            search_limit=limit,
+        )
+        with trace.stage("search"):
+            raw_hits = self.retriever.search(search_query, limit=limit, filters=filters)
+        with trace.stage("hydrate"):
+            selected = self.retriever.hydrate(pick_diverse_passages(raw_hits, max_items=top_k))
+        trace.note(candidates=len(raw_hits), selected=len(selected), books=len({p.book_id for p in selected}))
 
         if not selected:
-            return ChatResponse(
+            trace.note(path="no_results")
+            response = ChatResponse(
                 answer=self._no_results_answer(lang),
                 language=lang,
                 opinions=[],
                 citations=[],
                 notes=["No matching passages found in current local index."],
             )
+            return response, translated_query is not None or lang == "ar" or key_scope == "none"
 
-        llm_payload = self.llm.build_answer(
-            question,
-            lang,
-            selected,
-            max_opinions=max_opinions,
-            api_key=user_openai_api_key,
-        )
+        note = None
+        if key_scope != "none" and not self._llm_allowed(deadline):
+            self.metrics.incr("deadline_fallbacks")
+            note = DEADLINE_NOTE
+        elif key_scope != "none" and extractive_only:
+            self.metrics.incr("load_fallbacks")
+            note = LOAD_NOTE
+        if note:
+            trace.note(path="extractive")
+            with trace.stage("summarize"):
+                return self._build_fallback_response(lang, selected, max_opinions, search_query, note), False
+
+        with trace.stage("llm"):
+            llm_payload = self.llm.build_answer(
+                question,
+                lang,
+                selected,
+                max_opinions=max_opinions,
+                api_key=user_openai_api_key,
+                timeout=self._llm_timeout(deadline),
+            )
 
         if llm_payload:
-            return self._build_response_from_llm(lang, llm_payload, selected)
+            trace.note(path="llm")
+            with trace.stage("build"):
+                return self._build_response_from_llm(lang, llm_payload, selected, search_query), True
 
-        return self._build_fallback_response(lang, selected, max_opinions)
+        trace.note(path="extractive")
+        with trace.stage("summarize"):
+            return self._build_fallback_response(lang, selected, max_opinions, search_query), key_scope == "none"
+
+    def _llm_allowed(self, deadline: Deadline | None) -> bool:
+        return deadline is None or deadline.allows(self.settings.llm_min_budget_seconds)
+
+    @staticmethod
+    def _llm_timeout(deadline: Deadline | None) -> float | None:
+        return deadline.remaining() if deadline else None
+
+    def _translate(
+        self, question: str, api_key: str | None, key_scope: str, timeout: float | None = None
+    ) -> str | None:
+        cache_key = SharedCache.make_key(self.llm.model, key_scope, question.strip())
+        if self.cache:
+            cached = self.cache.get("translation", cache_key)
+            if cached:
+                return cached
+
+        translated = self.llm.translate_to_arabic(question, api_key=api_key, timeout=timeout)
+        if self.cache and translated:
+            self.cache.set("translation", cache_key, translated)
+        return translated
+
+    def _key_scope(self, user_openai_api_key: str | None) -> str:
+        """Identify whose key pays for a result without storing the key itself."""
+        user_key = (user_openai_api_key or "").strip()
+        if user_key:
+            return "user:" + hashlib.sha256(user_key.encode("utf-8")).hexdigest()[:32]
+        return "server" if self.settings.openai_api_key else "none"
+
+    def _flight_scope(self, key_scope: str) -> str:
+        """Callers are coalesced only with callers using the same key, unless sharing is enabled.
+
+        Even with sharing enabled, keyed (LLM) and keyless (extractive) requests never mix.
+        """
+        if self.settings.coalesce_across_keys and key_scope != "none":
+            return "llm"
+        return key_scope
+
+    @staticmethod
+    def _normalize_question(question: str) -> str:
+        return " ".join(question.split()).casefold()
 
     @staticmethod
     def detect_language(text: str) -> str:
+        detect, detect_error = _language_detector()
         try:
             return detect(text)
-        except LangDetectException:
+        except detect_error:
             return "und"
 
-    def _build_response_from_llm(self, lang: str, llm_payload: dict, selected: list[Passage]) -> ChatResponse:
-        citation_map = {p.id: self._to_citation(p) for p in selected}
+    def _build_response_from_llm(
+        self, lang: str, llm_payload: dict, selected: list[Passage], query: str = ""
+    ) -> ChatResponse:
+        passage_map = {p.id: p for p in selected}
 
         opinions: list[Opinion] = []
         for op in llm_payload.get("opinions", []):
             if not isinstance(op, dict):
                 continue
-            citation_ids = [cid for cid in op.get("citation_ids", []) if cid in citation_map]
+            citation_ids = [cid for cid in op.get("citation_ids", []) if cid in passage_map]
             if not citation_ids:
                 continue
             opinions.append(
@@ -85,7 +329,7 @@ class ChatService:
             )
 
         if not opinions:
-            return self._build_fallback_response(lang, selected, self.settings.default_max_opinions)
+            return self._build_fallback_response(lang, selected, self.settings.default_max_opinions, query)
 
         used_ids = []
         for opinion in opinions:
@@ -101,26 +345,28 @@ class ChatService:
             answer=answer,
             language=lang,
             opinions=opinions,
-            citations=[citation_map[cid] for cid in used_ids],
-            notes=[] if (user_openai_api_key or self.settings.openai_api_key) else ["No API key provided; using extractive fallback mode."],
+            citations=self._to_citations([passage_map[cid] for cid in used_ids]),
+            notes=[],
         )
 
-    def _build_fallback_response(self, lang: str, selected: list[Passage], max_opinions: int) -> ChatResponse:
-        grouped: dict[str, list[Passage]] = defaultdict(list)
+    def _build_fallback_response(
+        self, lang: str, selected: list[Passage], max_opinions: int, query: str = "", note: str = NO_KEY_NOTE
+    ) -> ChatResponse:
+        grouped: dict[int, list[Passage]] = defaultdict(list)
         for p in selected:
-            key = f"{p.book_title_ar} - {p.author_ar}"
-            grouped[key].append(p)
+            grouped[p.book_id].append(p)
+        groups = list(grouped.values())[:max_opinions]
+        # Summarize the whole passages; snippet_ar is cut to SNIPPET_CHARS and stays that way for citations.
+        texts = iter(self.retriever.full_texts([p for items in groups for p in items[:2]]))
+        extracts = self.summarizer.summarize_groups(query, [[next(texts) for _ in items[:2]] for items in groups])
 
         opinions: list[Opinion] = []
         used_ids: list[str] = []
 
-        for key, items in grouped.items():
-            if len(opinions) >= max_opinions:
-                break
-
+        for items, extract in zip(groups, extracts):
             primary = items[0]
-            quote = primary.snippet_ar.strip()
-            summary = self._fallback_opinion_text(lang, quote)
+            key = f"{primary.book_title_ar} - {primary.author_ar}"
+            summary = self._fallback_opinion_text(lang, extract or primary.snippet_ar)
             citation_ids = [p.id for p in items[:2]]
 
             opinions.append(
@@ -130,28 +376,20 @@ class ChatService:
                 if cid not in used_ids:
                     used_ids.append(cid)
 
-        citation_map = {p.id: self._to_citation(p) for p in selected}
+        passage_map = {p.id: p for p in selected}
 
         return ChatResponse(
             answer=self._fallback_summary(lang, selected),
             language=lang,
             opinions=opinions,
-            citations=[citation_map[cid] for cid in used_ids if cid in citation_map],
-            notes=["No API key provided; using extractive fallback mode."],
+            citations=self._to_citations([passage_map[cid] for cid in used_ids if cid in passage_map]),
+            notes=[note],
         )
 
     @staticmethod
-    def _to_citation(p: Passage) -> Citation:
-        return Citation(
-            id=p.id,
-            book_title_ar=p.book_title_ar,
-            author_ar=p.author_ar,
-            source_ref_ar=p.source_ref_ar,
-            volume=p.volume,
-            page=p.page,
-            snippet_ar=p.snippet_ar,
-            score=p.score,
-        )
+    def _to_citations(passages: list[Passage]) -> list[Citation]:
+        """Build citations for cited passages only, reading Passage attributes in one validator call."""
+        return _CITATION_LIST.validate_python(passages, from_attributes=True)
 
     @staticmethod
     def _fallback_summary(lang: str, selected: list[Passage]) -> str:
@@ -161,7 +399,7 @@ class ChatService:
 
     @staticmethod
     def _fallback_opinion_text(lang: str, quote: str) -> str:
-        trimmed = " ".join(quote.split())[:260]
+        trimmed = " ".join(quote.split())[:SUMMARY_CHARS]
         if lang == "ar":
             return f"يركز هذا المصدر على: {trimmed}"
         return f"This source emphasizes: {trimmed}"
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightTimeout(Exception):
+    """A follower stopped waiting for the leader's result."""
+
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """Run one computation per key at a time; concurrent callers with the same key share its result.
+
+    Only calls that overlap are coalesced. Once the leader finishes, the next
+    caller starts a fresh computation (or hits the answer cache).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call[T]] = {}
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, fn: Callable[[], T], timeout: float | None = None) -> tuple[T, bool]:
+        """Return (result, shared); shared is True when the result came from another caller's run.
+
+        A follower waits at most `timeout` seconds for the leader, then raises
+        FlightTimeout. The leader itself is never interrupted.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise FlightTimeout(key)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
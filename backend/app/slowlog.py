@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+
+class RequestTrace:
+    """Per-request stage timings and query details, kept only if the request turns out slow."""
+
+    __slots__ = ("started_at", "_started", "stages", "fields")
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.fields: dict[str, Any] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add(self, name: str, ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def note(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "total_ms": round(self.elapsed_ms(), 2),
+            "stages_ms": {name: round(ms, 2) for name, ms in self.stages.items()},
+            **self.fields,
+        }
+
+
+class SlowLog:
+    """Bounded in-memory log of slow requests, optionally appended to a JSONL file.
+
+    Disk errors are swallowed: the log is a diagnostic aid and must never fail a request.
+    """
+
+    def __init__(self, threshold_ms: float, capacity: int = 200, path: Path | None = None):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self._entries: deque[dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self._lock = threading.Lock()
+
+    def is_slow(self, trace: RequestTrace) -> bool:
+        return self.threshold_ms > 0 and trace.elapsed_ms() >= self.threshold_ms
+
+    def record(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            if self.path is None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except OSError:
+                return
+
+    def entries(self, limit: int = 50) -> list[dict[str, Any]]:
+        """Most recent first."""
+        with self._lock:
+            return list(reversed(self._entries))[:limit]
+
+
+class SamplingProfiler:
+    """Sample one thread's stack at a fixed interval from a helper thread.
+
+    Uses sys._current_frames(), so nothing is installed globally (unlike
+    sys.setprofile) and other requests in the process run at full speed.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 40):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._lines: Counter[str] = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="nusus-profiler", daemon=True)
+
+    def start(self) -> SamplingProfiler:
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self._lines[_frame_label(frame, with_line=True)] += 1
+            stack: list[str] = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self._stacks[tuple(reversed(stack))] += 1
+            self._samples += 1
+
+    def stop(self, top: int = 15) -> dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": self._samples,
+            "top_lines": [{"line": line, "samples": n} for line, n in self._lines.most_common(top)],
+            "top_stacks": [{"stack": list(stack), "samples": n} for stack, n in self._stacks.most_common(top)],
+        }
+
+
+def _frame_label(frame, with_line: bool = False) -> str:
+    code = frame.f_code
+    parts = Path(code.co_filename).parts[-2:]
+    label = f"{'/'.join(parts)}:{code.co_name}"
+    return f"{label}:{frame.f_lineno}" if with_line else label
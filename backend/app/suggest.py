@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING
+
+from .retrieval import CorpusRetriever, normalize_for_match
+from .summarizer import fold_arabic
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_PREFIX_END = "\U0010ffff"
+
+
+class Suggester:
+    """Prefix completions for corpus terms and book titles, held in memory.
+
+    Terms come from the FTS5 vocabulary of the text column and are keyed by their
+    folded form, so a prefix typed with diacritics or without hamza still matches.
+    A lookup bisects the sorted keys and ranks the matching range by document
+    frequency, so it never touches SQLite.
+    """
+
+    def __init__(self, retriever: CorpusRetriever, max_terms: int = 200_000, min_docs: int = 2, min_prefix: int = 2):
+        self.retriever = retriever
+        self.max_terms = max_terms
+        self.min_docs = min_docs
+        self.min_prefix = min_prefix
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._keys: list[str] = []
+        self._terms: list[str] = []
+        self._docs: np.ndarray | None = None
+        self._title_keys: list[str] = []
+        self._titles: list[tuple[str, str]] = []
+
+    def load(self) -> dict[str, int]:
+        """Read the vocabulary and book titles once; later calls are no-ops."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+        return {"suggest_terms": len(self._keys), "suggest_titles": len(self._titles)}
+
+    def _load(self) -> None:
+        import numpy as np
+
+        vocab = self.retriever.vocabulary(min_docs=self.min_docs)
+        ranked = sorted(vocab.items(), key=lambda item: item[1], reverse=True)[: self.max_terms]
+
+        # Spelling variants that fold to one key are shown as their most frequent form.
+        merged: dict[str, tuple[str, int]] = {}
+        for term, doc in ranked:
+            key = fold_arabic(term)
+            known = merged.get(key)
+            merged[key] = (known[0], known[1] + doc) if known else (term, doc)
+
+        self._keys = sorted(merged)
+        self._terms = [merged[key][0] for key in self._keys]
+        self._docs = np.fromiter((merged[key][1] for key in self._keys), dtype=np.int64, count=len(self._keys))
+
+        titles = sorted((fold_arabic(title), title, author) for title, author in self.retriever.book_titles())
+        self._title_keys = [key for key, _, _ in titles]
+        self._titles = [(title, author) for _, title, author in titles]
+
+    def suggest(self, text: str, limit: int = 8) -> tuple[list[tuple[str, int]], list[tuple[str, str]]]:
+        """Complete the last word as a term and the whole input as a book title."""
+        self.load()
+        words = normalize_for_match(text).split()
+        if not words:
+            return [], []
+        return self._complete_term(fold_arabic(words[-1]), limit), self._complete_title(fold_arabic(" ".join(words)), limit)
+
+    def _complete_term(self, prefix: str, limit: int) -> list[tuple[str, int]]:
+        if len(prefix) < self.min_prefix or self._docs is None:
+            return []
+
+        import numpy as np
+
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + _PREFIX_END, lo)
+        docs = self._docs[lo:hi]
+        if docs.size > limit:
+            top = np.argpartition(-docs, limit - 1)[:limit]
+        else:
+            top = np.arange(docs.size)
+        top = top[np.argsort(-docs[top], kind="stable")]
+        return [(self._terms[lo + int(i)], int(docs[i])) for i in top]
+
+    def _complete_title(self, prefix: str, limit: int) -> list[tuple[str, str]]:
+        if len(prefix) < self.min_prefix:
+            return []
+        lo = bisect_left(self._title_keys, prefix)
+        hi = bisect_left(self._title_keys, prefix + _PREFIX_END, lo)
+        # Shortest titles first: they are the closest completions of what was typed.
+        return sorted(self._titles[lo : min(hi, lo + 50)], key=lambda item: len(item[0]))[:limit]
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?؟؛])\s+|\n+")
+_CLAUSE_BREAK = re.compile(r"(?<=[،,:])\s+")
+_TOKEN = re.compile(r"[\w\u0600-\u06FF]+", flags=re.UNICODE)
+_DIACRITICS = re.compile(r"[\u0640\u064B-\u0652\u0670]")
+_LETTER_FOLD = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+SUMMARY_CHARS = 320
+
+
+def fold_arabic(text: str) -> str:
+    """Drop diacritics and tatweel and unify letter variants, so spelling variants share a term."""
+    return _DIACRITICS.sub("", text).translate(_LETTER_FOLD).casefold()
+
+
+def _strip_prefix(token: str) -> str:
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            return token[len(prefix) :]
+    return token
+
+
+_STOPWORDS = frozenset(
+    _strip_prefix(fold_arabic(word))
+    for word in (
+        "في من على إلى عن مع عند أن إن لا ما لم لن قد كان كانت هو هي هم ذلك هذا هذه تلك التي الذي الذين "
+        "ثم أو و ف ب ل كل بعض غير إذا إذ فإن وإن وأن وهو وهي ولا وما ومن وفي به بها له لها فيه فيها منه منها "
+        "عليه عليها قال قوله أي إلا بل حتى كما لأن ليس أما وقد فلا the of and to in is a"
+    ).split()
+)
+
+
+def terms(text: str) -> list[str]:
+    tokens = (_strip_prefix(token) for token in _TOKEN.findall(fold_arabic(text)))
+    return [token for token in tokens if len(token) >= 2 and token not in _STOPWORDS]
+
+
+def split_sentences(text: str, max_chars: int = 220, min_chars: int = 25) -> list[str]:
+    """Split on sentence punctuation, then on clause commas or word boundaries for long runs.
+
+    Classical texts often run for hundreds of characters without a full stop,
+    so a bare punctuation split would leave whole passages as one "sentence".
+    """
+    sentences: list[str] = []
+    for piece in _SENTENCE_BREAK.split(text):
+        piece = " ".join(piece.split())
+        if len(piece) <= max_chars:
+            if piece:
+                sentences.append(piece)
+            continue
+
+        current = ""
+        for clause in _CLAUSE_BREAK.split(piece):
+            for word in clause.split():
+                if current and len(current) + 1 + len(word) > max_chars:
+                    sentences.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}" if current else word
+            if len(current) >= min_chars:
+                sentences.append(current)
+                current = ""
+        if current:
+            sentences.append(current)
+
+    sentences = [sentence.lstrip("،,؛;: ") for sentence in sentences]
+    kept = [sentence for sentence in sentences if len(sentence) >= min_chars]
+    return kept or sentences[:1]
+
+
+class ExtractiveSummarizer:
+    """Pick query-relevant, non-redundant sentences from retrieved passages without an LLM.
+
+    Sentences are TF-IDF vectors over the retrieved text. Relevance is the cosine
+    similarity to the query plus a smaller centrality term (similarity to the
+    centroid), and each group is summarized with maximal marginal relevance.
+    NumPy is imported on first use, not at startup.
+    """
+
+    def __init__(self, max_sentences: int = 2, max_chars: int = SUMMARY_CHARS, relevance_weight: float = 0.7):
+        self.max_sentences = max_sentences
+        self.max_chars = max_chars
+        self.relevance_weight = relevance_weight
+
+    def warm_up(self) -> None:
+        self.summarize_groups("warm up", [["warm up the summarizer. second sentence here for the vectors."]])
+
+    def summarize_groups(self, query: str, groups: list[list[str]]) -> list[str]:
+        """Return one summary per group of passage texts; empty when a group has no usable sentence."""
+        import numpy as np
+
+        sentences: list[str] = []
+        owners: list[int] = []
+        for group, texts in enumerate(groups):
+            for text in texts:
+                for sentence in split_sentences(text):
+                    sentences.append(sentence)
+                    owners.append(group)
+        if not sentences:
+            return ["" for _ in groups]
+
+        vocab: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        for row, sentence in enumerate(sentences):
+            for term in terms(sentence):
+                rows.append(row)
+                cols.append(vocab.setdefault(term, len(vocab)))
+        if not vocab:
+            # Only stopwords and one-letter tokens: nothing to score, callers fall back to the snippet.
+            return ["" for _ in groups]
+
+        counts = np.zeros((len(sentences), len(vocab)), dtype=np.float32)
+        np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+        df = np.count_nonzero(counts, axis=0)
+        idf = np.log((1.0 + len(sentences)) / (1.0 + df)) + 1.0
+        vectors = _normalize_rows(np.log1p(counts) * idf)
+
+        query_vector = np.zeros(len(vocab), dtype=np.float32)
+        for term in terms(query):
+            column = vocab.get(term)
+            if column is not None:
+                query_vector[column] += 1.0
+        centroid = vectors.mean(axis=0)
+        relevance = vectors @ _normalize(query_vector) + 0.25 * (vectors @ _normalize(centroid))
+        similarity = vectors @ vectors.T
+
+        owner_array = np.asarray(owners)
+        return [
+            self._summarize_group(sentences, np.flatnonzero(owner_array == group), relevance, similarity)
+            for group in range(len(groups))
+        ]
+
+    def _summarize_group(
+        self, sentences: list[str], candidates: np.ndarray, relevance: np.ndarray, similarity: np.ndarray
+    ) -> str:
+        if candidates.size == 0:
+            return ""
+
+        import numpy as np
+
+        chosen: list[int] = []
+        length = 0
+        remaining = candidates.copy()
+        while remaining.size and len(chosen) < self.max_sentences:
+            scores = self.relevance_weight * relevance[remaining]
+            if chosen:
+                scores = scores - (1.0 - self.relevance_weight) * similarity[np.ix_(remaining, chosen)].max(axis=1)
+            best = int(remaining[int(np.argmax(scores))])
+            remaining = remaining[remaining != best]
+            added = len(sentences[best]) + (1 if chosen else 0)
+            if chosen and length + added > self.max_chars:
+                continue
+            chosen.append(best)
+            length += added
+
+        return self._trim(" ".join(sentences[index] for index in sorted(chosen)))
+
+    def _trim(self, text: str) -> str:
+        if len(text) <= self.max_chars:
+            return text
+        cut = text[: self.max_chars].rsplit(" ", 1)[0]
+        return f"{cut}…"
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("PUBLIC_LAUNCH_REMINDER", "0")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from backend.app.config import get_settings  # noqa: E402
+from backend.app.main import ModelJSONResponse  # noqa: E402
+from backend.app.models import ChatResponse, Citation  # noqa: E402
+from backend.app.retrieval import CorpusRetriever, Passage, pick_diverse_passages  # noqa: E402
+from backend.app.service import ChatService  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark the retrieval-to-response path.")
+    parser.add_argument("--db", default="", help="Optional corpus sqlite; synthetic passages are used when omitted")
+    parser.add_argument("--query", default="البيع", help="Query used with --db")
+    parser.add_argument("--candidates", type=int, default=30, help="Retrieved candidates per request")
+    parser.add_argument("--top-k", type=int, default=12, help="Passages kept after diversity filtering")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed iterations per stage")
+    return parser.parse_args()
+
+
+def synthetic_passages(count: int) -> list[Passage]:
+    text = "ومن شروط صحة البيع التراضي بين المتبايعين، وأن يكون المعقود عليه معلوماً مباحاً مقدوراً على تسليمه. " * 4
+    return [
+        Passage(
+            id=f"book{i % 10}:page:{i}",
+            book_title_ar=f"كتاب {i % 10}",
+            author_ar=f"مؤلف {i % 10}",
+            source_ref_ar=f"كتاب {i % 10}، ج1، ص{i}",
+            volume="1",
+            page=str(i),
+            snippet_ar=text[:400],
+            score=-10.0 + i * 0.1,
+            book_id=i % 10,
+            char_start=0,
+            char_end=400,
+        )
+        for i in range(count)
+    ]
+
+
+def time_us(fn, iterations: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) * 1_000_000 / iterations
+
+
+def validated_citation(p: Passage) -> Citation:
+    return Citation(
+        id=p.id,
+        book_title_ar=p.book_title_ar,
+        author_ar=p.author_ar,
+        source_ref_ar=p.source_ref_ar,
+        volume=p.volume,
+        page=p.page,
+        snippet_ar=p.snippet_ar,
+        score=p.score,
+        char_start=p.char_start,
+        char_end=p.char_end,
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    settings = get_settings()
+    service = ChatService(settings)
+
+    if args.db:
+        retriever = CorpusRetriever(Path(args.db).resolve())
+        candidates = retriever.search(args.query, limit=args.candidates)
+        search_us = time_us(lambda: retriever.search(args.query, limit=args.candidates), max(1, args.iterations // 20))
+    else:
+        candidates = synthetic_passages(args.candidates)
+        search_us = 0.0
+
+    selected = pick_diverse_passages(candidates, max_items=args.top_k)
+    if args.db:
+        retriever.hydrate(selected)
+    grouped: dict[int, list[str]] = {}
+    for p in selected:
+        grouped.setdefault(p.book_id, []).append(p.snippet_ar)
+    groups = [texts[:2] for texts in grouped.values()][: settings.default_max_opinions]
+    response = service._build_fallback_response("ar", selected, settings.default_max_opinions, args.query)
+
+    field = create_model_field("Response", ChatResponse)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_serialize() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=response))
+        return JSONResponse(content).body
+
+    stages = [
+        ("diversity filter", lambda: pick_diverse_passages(candidates, max_items=args.top_k)),
+        ("citations (validated)", lambda: [validated_citation(p) for p in selected]),
+        ("citations (from_attributes, batched)", lambda: service._to_citations(selected)),
+        ("extractive summaries", lambda: service.summarizer.summarize_groups(args.query, groups)),
+        (
+            "build fallback response",
+            lambda: service._build_fallback_response("ar", selected, settings.default_max_opinions, args.query),
+        ),
+        ("serialize via response_model", fastapi_serialize),
+        ("serialize via ModelJSONResponse", lambda: ModelJSONResponse(response).body),
+    ]
+
+    print(f"{len(candidates)} candidates, {len(selected)} selected, {args.iterations} iterations")
+    if args.db:
+        print(f"  {'search':<36} {search_us:9.1f} us")
+    for label, fn in stages:
+        print(f"  {label:<36} {time_us(fn, args.iterations):9.1f} us")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
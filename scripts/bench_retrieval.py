@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.app.retrieval import CorpusRetriever, shard_paths  # noqa: E402
+
+DEFAULT_QUERIES = [
+    "البيع",
+    "الغرر",
+    "شروط صحة البيع",
+    "الثمن معلوما",
+    "اختلف العلماء",
+    "النهي عن بيع الغرر",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Report index size and retrieval latency for one or more corpus indexes.")
+    parser.add_argument("--db", action="append", required=True, help="Corpus sqlite path (repeat to compare indexes)")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        action="append",
+        default=None,
+        help="Shard count to load each index with (repeat to compare, e.g. --shards 1 --shards 4)",
+    )
+    parser.add_argument("--queries", default="", help="Optional file with one query per line")
+    parser.add_argument("--limit", type=int, default=30, help="Candidates fetched per search")
+    parser.add_argument("--hydrate", type=int, default=12, help="Top passages whose text is decompressed per search")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    return parser.parse_args()
+
+
+def load_queries(path: str) -> list[str]:
+    if not path:
+        return DEFAULT_QUERIES
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def index_stats(paths: list[Path]) -> tuple[int, int]:
+    count = 0
+    text_bytes = 0
+    for path in paths:
+        with sqlite3.connect(str(path)) as conn:
+            rows, stored = conn.execute(
+                "SELECT count(*), coalesce(sum(length(coalesce(text_zst, CAST(text_ar AS BLOB)))), 0) FROM passages"
+            ).fetchone()
+        count += int(rows)
+        text_bytes += int(stored)
+    return count, text_bytes
+
+
+def bench_db(db_path: Path, shards: int, queries: list[str], limit: int, hydrate: int, repeat: int) -> None:
+    paths = shard_paths(db_path, shards)
+    missing = [path for path in paths if not path.exists()]
+    if missing:
+        raise SystemExit(f"Index not found: {missing[0]}")
+
+    retriever = CorpusRetriever(db_path, shards=shards)
+    for query in queries:
+        retriever.hydrate(retriever.search(query, limit=limit)[:hydrate])
+
+    timings_ms: list[float] = []
+    hits = 0
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            results = retriever.search(query, limit=limit)
+            retriever.hydrate(results[:hydrate])
+            hits += len(results)
+            timings_ms.append((time.perf_counter() - started) * 1000)
+
+    timings_ms.sort()
+    count, text_bytes = index_stats(paths)
+    size_mb = sum(path.stat().st_size for path in paths) / (1024 * 1024)
+    p95 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.95))]
+    print(f"{db_path} ({shards} shard{'s' if shards > 1 else ''})")
+    print(f"  size: {size_mb:.2f} MB, passages: {count}, stored text: {text_bytes / (1024 * 1024):.2f} MB")
+    print(
+        f"  search: mean {statistics.fmean(timings_ms):.2f} ms, p50 {statistics.median(timings_ms):.2f} ms, "
+        f"p95 {p95:.2f} ms, avg hits {hits / len(timings_ms):.1f}"
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    queries = load_queries(args.queries)
+    if not queries:
+        raise SystemExit("No queries to run")
+
+    for db in args.db:
+        for shards in args.shards or [1]:
+            bench_db(Path(db).resolve(), shards, queries, limit=args.limit, hydrate=args.hydrate, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
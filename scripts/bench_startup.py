@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure server cold start: import time, first /api/health and first /api/chat.")
+    parser.add_argument("--db", default="", help="Corpus sqlite path (defaults to NUSUS_DB_PATH / data/corpus.sqlite)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts")
+    parser.add_argument("--question", default="شروط صحة البيع", help="Question sent as the first chat")
+    parser.add_argument("--warmup-mode", default="background", choices=["off", "sync", "background"])
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each endpoint")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(request: urllib.request.Request, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return (time.perf_counter() - started) * 1000
+        except urllib.error.HTTPError as exc:
+            raise SystemExit(f"{request.full_url} failed with HTTP {exc.code}") from exc
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise SystemExit(f"Timed out waiting for {request.full_url}")
+
+
+def measure_import(env: dict[str, str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import backend.app.main"], cwd=REPO_ROOT, env=env, check=True, capture_output=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure_server(env: dict[str, str], question: str, timeout: float) -> tuple[float, float]:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        health_ms = wait_for(urllib.request.Request(f"{base}/api/health"), started, timeout)
+        chat = urllib.request.Request(
+            f"{base}/api/chat",
+            data=json.dumps({"question": question}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        chat_ms = wait_for(chat, started, timeout)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return health_ms, chat_ms
+
+
+def summarize(label: str, values: list[float]) -> None:
+    print(f"  {label}: mean {statistics.fmean(values):.0f} ms, min {min(values):.0f} ms, max {max(values):.0f} ms")
+
+
+def main() -> None:
+    args = parse_args()
+    env = dict(os.environ)
+    env["PUBLIC_LAUNCH_REMINDER"] = "0"
+    env["NUSUS_WARMUP"] = args.warmup_mode
+    env["NUSUS_CACHE_PATH"] = ""
+    if args.db:
+        env["NUSUS_DB_PATH"] = str(Path(args.db).resolve())
+
+    imports: list[float] = []
+    healths: list[float] = []
+    chats: list[float] = []
+    for _ in range(args.runs):
+        imports.append(measure_import(env))
+        health_ms, chat_ms = measure_server(env, args.question, args.timeout)
+        healths.append(health_ms)
+        chats.append(chat_ms)
+
+    print(f"Cold start over {args.runs} runs (warm-up mode: {args.warmup_mode})")
+    summarize("import backend.app.main", imports)
+    summarize("first /api/health", healths)
+    summarize("first /api/chat", chats)
+
+
+if __name__ == "__main__":
+    main()
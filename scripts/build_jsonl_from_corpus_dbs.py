@@ -2,11 +2,18 @@
 from __future__ import annotations
 
 import argparse
+import io
 import json
+import os
 import re
 import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from corpus_ledger import EXTRACTED, Ledger, Progress, file_sha256
+
 TEXT_COL_PRIORITY = [
     "text_ar",
     "text",
@@ -24,13 +31,60 @@ VOLUME_COL_PRIORITY = ["volume", "part", "juz", "vol"]
 
 AR_RE = re.compile(r"[\u0600-\u06FF]")
 
+# Break points in order of preference: sentence ends, clause punctuation, then any whitespace.
+BREAK_PATTERNS = [
+    re.compile(r"[.!?؟؛\n]+"),
+    re.compile(r"[،,:;]+"),
+    re.compile(r"\s+"),
+]
+
+
+@dataclass(frozen=True)
+class ChunkConfig:
+    max_chars: int = 1200
+    overlap_chars: int = 150
+    min_chars: int = 200
+
+
+@dataclass
+class ExtractStats:
+    rows: int = 0
+    pages: int = 0
+    passages: int = 0
+    chars: int = 0
+    skipped_tables: list[str] = field(default_factory=list)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Build JSONL passages from extracted corpus SQLite databases.")
     parser.add_argument("--db-root", required=True, help="Root folder containing many .db files")
     parser.add_argument("--output", required=True, help="Output JSONL path")
     parser.add_argument("--max-per-db", type=int, default=0, help="Optional max rows per db (0 = unlimited)")
-    return parser.parse_args()
+    parser.add_argument("--ledger", default="", help="Progress ledger sqlite (default: <output stem>.ledger.sqlite)")
+    parser.add_argument("--restart", action="store_true", help="Discard the ledger and extract every source again")
+    parser.add_argument(
+        "--chunk-chars",
+        type=int,
+        default=ChunkConfig.max_chars,
+        help="Target max characters per passage (0 = one passage per page, no splitting)",
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        default=ChunkConfig.overlap_chars,
+        help="Characters repeated between consecutive chunks of the same page",
+    )
+    parser.add_argument(
+        "--min-chunk-chars",
+        type=int,
+        default=ChunkConfig.min_chars,
+        help="Pages shorter than this are packed with the following pages of the same book, "
+        "and trailing chunks shorter than this are merged into the previous chunk",
+    )
+    args = parser.parse_args()
+    if args.chunk_chars > 0 and not 0 <= args.chunk_overlap < args.chunk_chars // 2:
+        parser.error("--chunk-overlap must be >= 0 and smaller than half of --chunk-chars")
+    return args
 
 
 def choose_col(columns: list[str], preferred: list[str]) -> str | None:
@@ -76,8 +130,80 @@ def table_columns(conn: sqlite3.Connection, table: str) -> list[str]:
     return [r[1] for r in rows]
 
 
-def extract_from_db(db_path: Path, out_file, max_per_db: int = 0) -> int:
-    count = 0
+def find_break(text: str, lo: int, hi: int) -> int:
+    """Return the end offset of the best break point inside text[lo:hi], or hi if none."""
+    for pattern in BREAK_PATTERNS:
+        last_end = -1
+        for match in pattern.finditer(text, lo, hi):
+            last_end = match.end()
+        if last_end > lo:
+            return last_end
+    return hi
+
+
+def find_start(text: str, lo: int, hi: int) -> int:
+    """Return the offset of the first clean chunk start inside text[lo:hi], or lo if none."""
+    for pattern in BREAK_PATTERNS:
+        match = pattern.search(text, lo, hi)
+        if match and match.end() < hi:
+            return match.end()
+    return lo
+
+
+def format_source_ref(book_title: str, volume: str, page: str) -> str:
+    source_ref = book_title
+    if volume:
+        source_ref += f"، ج{volume}"
+    if page:
+        source_ref += f"، ص{page}"
+    return source_ref
+
+
+def page_range(first: str, last: str) -> str:
+    if not first or not last or first == last:
+        return first or last
+    return f"{first}-{last}"
+
+
+def chunk_spans(text: str, config: ChunkConfig) -> list[tuple[int, int]]:
+    """Split text into overlapping (start, end) windows that end on punctuation where possible."""
+    n = len(text)
+    if config.max_chars <= 0 or n <= config.max_chars:
+        return [(0, n)]
+
+    spans: list[tuple[int, int]] = []
+    start = 0
+    while start < n:
+        hard_end = start + config.max_chars
+        end = n if hard_end >= n else find_break(text, start + config.max_chars // 2, hard_end)
+        spans.append((start, end))
+        if end >= n:
+            break
+        start = find_start(text, max(end - config.overlap_chars, start + 1), end)
+
+    if len(spans) > 1 and spans[-1][1] - spans[-1][0] < config.min_chars:
+        tail = spans.pop()
+        spans[-1] = (spans[-1][0], tail[1])
+
+    trimmed: list[tuple[int, int]] = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if e > s:
+            trimmed.append((s, e))
+    return trimmed
+
+
+def extract_from_db(
+    db_path: Path,
+    out_file,
+    max_per_db: int = 0,
+    chunk_config: ChunkConfig | None = None,
+) -> ExtractStats:
+    stats = ExtractStats()
+    chunk_config = chunk_config or ChunkConfig()
     book_fallback = db_path.stem
 
     conn = sqlite3.connect(str(db_path))
@@ -85,7 +211,7 @@ def extract_from_db(db_path: Path, out_file, max_per_db: int = 0) -> int:
     try:
         tables = list_tables(conn)
         if not tables:
-            return 0
+            return stats
 
         for table in tables:
             cols = table_columns(conn, table)
@@ -114,47 +240,114 @@ def extract_from_db(db_path: Path, out_file, max_per_db: int = 0) -> int:
 
             try:
                 rows = conn.execute(query).fetchall()
-            except Exception:
+            except sqlite3.Error as exc:
+                stats.skipped_tables.append(f"{table}: {exc}")
                 continue
 
+            # Consecutive rows that belong to the same page are merged into one page text,
+            # so short rows are not indexed on their own and offsets refer to the page.
+            page_key: tuple | None = None
+            page_rows: list[tuple[str, str]] = []
+            page_meta: dict[str, str] = {}
+
+            # Pages shorter than min_chars (headings, one-line pages, or single rows of tables
+            # without a page column) are packed with the following pages of the same book, up
+            # to max_chars, so one-line passages do not skew BM25 length normalization.
+            packed: list[tuple[str, dict[str, str], str]] = []
+
+            def packed_chars() -> int:
+                return sum(len(text) + 1 for _, _, text in packed) - 1
+
+            def write_passages(base_id: str, meta: dict[str, str], text: str, pages: int, last_offset: int) -> None:
+                if not is_candidate_text(text):
+                    return
+
+                stats.pages += pages
+                spans = chunk_spans(text, chunk_config)
+                for idx, (start, end) in enumerate(spans):
+                    text_ar = " ".join(text[start:end].split())
+                    if not text_ar:
+                        continue
+                    out = {
+                        "id": base_id if len(spans) == 1 else f"{base_id}#{idx + 1}",
+                        **meta,
+                        # For packed pages, char_start is in the first page and char_end in the last one.
+                        "char_start": start,
+                        "char_end": end - last_offset,
+                        "text_ar": text_ar,
+                    }
+                    out_file.write(json.dumps(out, ensure_ascii=False) + "\n")
+                    stats.passages += 1
+                    stats.chars += len(text_ar)
+
+            def flush_packed() -> None:
+                if not packed:
+                    return
+                base_id, meta, _ = packed[0]
+                text = "\n".join(page_text for _, _, page_text in packed)
+                last_offset = 0
+                if len(packed) > 1:
+                    last_offset = len(text) - len(packed[-1][2])
+                    page = page_range(meta["page"], packed[-1][1]["page"])
+                    source_ref = format_source_ref(meta["book_title_ar"], meta["volume"], page)
+                    meta = {**meta, "source_ref_ar": source_ref, "page": page}
+                write_passages(base_id, meta, text, len(packed), last_offset)
+                packed.clear()
+
+            def flush_page() -> None:
+                if not page_rows:
+                    return
+                page_text = "\n".join(text for _, text in page_rows)
+                book = (page_meta["book_title_ar"], page_meta["author_ar"], page_meta["volume"])
+                if packed:
+                    _, first_meta, _ = packed[0]
+                    same_book = book == (first_meta["book_title_ar"], first_meta["author_ar"], first_meta["volume"])
+                    if not same_book or packed_chars() + 1 + len(page_text) > chunk_config.max_chars:
+                        flush_packed()
+                packed.append((f"{db_path.stem}:{table}:{page_rows[0][0]}", page_meta, page_text))
+                if packed_chars() >= chunk_config.min_chars or chunk_config.max_chars <= 0:
+                    flush_packed()
+
             for row in rows:
+                stats.rows += 1
                 text_val = str(row[text_col] or "").strip()
-                if not is_candidate_text(text_val):
+                if not text_val:
                     continue
 
-                row_id = str(row[id_col]) if id_col else f"{table}-{count+1}"
+                row_id = str(row[id_col]) if id_col else f"{table}-{stats.rows}"
                 book_title = str(row[book_col]).strip() if book_col else book_fallback
                 author = str(row[author_col]).strip() if author_col else "غير محدد"
                 page = str(row[page_col]).strip() if page_col else ""
                 volume = str(row[volume_col]).strip() if volume_col else ""
 
-                source_ref = f"{book_title}"
-                if volume:
-                    source_ref += f"، ج{volume}"
-                if page:
-                    source_ref += f"، ص{page}"
+                key = (book_title, author, volume, page) if page else None
+                if key is None or key != page_key:
+                    flush_page()
+                    page_rows = []
 
-                out = {
-                    "id": f"{db_path.stem}:{table}:{row_id}",
+                page_key = key
+                page_meta = {
                     "book_title_ar": book_title or book_fallback,
                     "author_ar": author or "غير محدد",
-                    "source_ref_ar": source_ref,
+                    "source_ref_ar": format_source_ref(book_title, volume, page),
                     "volume": volume,
                     "page": page,
-                    "text_ar": " ".join(text_val.split()),
                 }
-                out_file.write(json.dumps(out, ensure_ascii=False) + "\n")
-                count += 1
+                page_rows.append((row_id, text_val))
+
+            flush_page()
+            flush_packed()
     finally:
         conn.close()
 
-    return count
+    return stats
 
 
 def main() -> None:
     args = parse_args()
     db_root = Path(args.db_root).resolve()
     output_path = Path(args.output).resolve()
+    ledger_path = Path(args.ledger).resolve() if args.ledger else output_path.with_suffix(".ledger.sqlite")
 
     if not db_root.exists():
         raise SystemExit(f"DB root not found: {db_root}")
@@ -165,15 +358,106 @@ def main() -> None:
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    total = 0
-    with output_path.open("w", encoding="utf-8") as out:
-        for db in db_files:
+    chunk_config = ChunkConfig(
+        max_chars=args.chunk_chars,
+        overlap_chars=args.chunk_overlap,
+        min_chars=args.min_chunk_chars,
+    )
+
+    ledger = Ledger(ledger_path)
+    config = {
+        "db_root": str(db_root),
+        "output": str(output_path),
+        "max_per_db": args.max_per_db,
+        "chunk": [chunk_config.max_chars, chunk_config.overlap_chars, chunk_config.min_chars],
+    }
+    resuming = ledger.check_config("extract", config, args.restart)
+    committed = ledger.committed_offset() if resuming else 0
+    if resuming and (not output_path.exists() or output_path.stat().st_size < committed):
+        raise SystemExit(f"{output_path} is shorter than {ledger_path} records; rerun with --restart")
+
+    # Sources already exported are skipped; size and mtime decide quickly, the checksum settles the rest.
+    done = ledger.sources() if resuming else {}
+    todo: list[tuple[Path, str, os.stat_result]] = []
+    changed: list[str] = []
+    for db in db_files:
+        rel = str(db.relative_to(db_root))
+        st = db.stat()
+        row = done.get(rel)
+        if row is not None and row["status"] == EXTRACTED:
+            if (row["size"], row["mtime_ns"]) != (st.st_size, st.st_mtime_ns) and file_sha256(db) != row["sha256"]:
+                changed.append(rel)
+            continue
+        todo.append((db, rel, st))
+
+    if resuming:
+        print(f"Resuming: {len(db_files) - len(todo)} of {len(db_files)} sources already extracted", file=sys.stderr)
+    for rel in changed:
+        print(f"Changed since it was extracted (rerun with --restart to export it again): {rel}", file=sys.stderr)
+
+    total = ExtractStats()
+    failed = 0
+    progress = Progress("extract", len(todo), sum(st.st_size for _, _, st in todo))
+    with output_path.open("r+b" if resuming else "w+b") as raw:
+        # Drop output of a source that was interrupted before the ledger recorded it.
+        raw.truncate(committed)
+        raw.seek(committed)
+        out = io.TextIOWrapper(raw, encoding="utf-8", newline="\n", write_through=True)
+        for db, rel, st in todo:
+            started = time.perf_counter()
+            out_start = raw.tell()
+            checksum = ""
+            stats = ExtractStats()
             try:
-                total += extract_from_db(db, out, max_per_db=args.max_per_db)
-            except Exception:
-                continue
-
-    print(f"Wrote {total} passages to {output_path}")
+                checksum = file_sha256(db)
+                stats = extract_from_db(db, out, max_per_db=args.max_per_db, chunk_config=chunk_config)
+                out.flush()
+            except Exception as exc:  # one unreadable book must not abort a multi-hour run
+                out.flush()
+                raw.seek(out_start)
+                raw.truncate()
+                error = f"{type(exc).__name__}: {exc}"
+                ledger.record_failed(rel, st.st_size, st.st_mtime_ns, checksum, error, time.perf_counter() - started)
+                print(f"Failed {rel}: {error}", file=sys.stderr)
+                failed += 1
+            else:
+                raw.flush()
+                os.fsync(raw.fileno())
+                ledger.record_extracted(
+                    rel,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    checksum,
+                    rows=stats.rows,
+                    pages=stats.pages,
+                    passages=stats.passages,
+                    out_start=out_start,
+                    out_end=raw.tell(),
+                    seconds=time.perf_counter() - started,
+                    error="; ".join(stats.skipped_tables) or None,
+                )
+                for skipped in stats.skipped_tables:
+                    print(f"Skipped table in {rel}: {skipped}", file=sys.stderr)
+                total.rows += stats.rows
+                total.pages += stats.pages
+                total.passages += stats.passages
+                total.chars += stats.chars
+            progress.advance(st.st_size, stats.passages)
+        out.detach()
+
+    avg_chars = total.chars // total.passages if total.passages else 0
+    print(
+        f"Wrote {total.passages} passages from {total.pages} pages ({total.rows} rows) to {output_path}; "
+        f"avg {avg_chars} chars per passage"
+    )
+    failures = ledger.failures()
+    if failures:
+        print(f"{len(failures)} sources failed ({failed} in this run); rerun to retry them:", file=sys.stderr)
+        for row in failures[:20]:
+            print(f"  {row['path']}: {row['error']}", file=sys.stderr)
+        if len(failures) > 20:
+            print(f"  ... see status = 'failed' in {ledger_path}", file=sys.stderr)
+    ledger.close()
 
 
 if __name__ == "__main__":
@@ -3,15 +3,78 @@ from __future__ import annotations
 
 import argparse
 import json
+import random
 import sqlite3
+import sys
+import zlib
+from collections.abc import Iterable
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from corpus_ledger import Ledger, Progress
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Build local corpus sqlite index from JSONL passages.")
     parser.add_argument("--input", required=True, help="Input JSONL path")
     parser.add_argument("--output", required=True, help="Output sqlite DB path")
-    return parser.parse_args()
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Number of index shards (1 = single file; otherwise set NUSUS_DB_SHARDS to the same value)",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["book", "category"],
+        default="book",
+        help="Partition key; 'category' uses the optional JSONL category field and falls back to the book",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=["none", "zstd"],
+        default="none",
+        help="Store passage text as zstd blobs compressed with a dictionary trained on the corpus",
+    )
+    parser.add_argument("--zstd-level", type=int, default=9, help="zstd compression level")
+    parser.add_argument("--dict-size", type=int, default=112_640, help="Trained zstd dictionary size in bytes")
+    parser.add_argument("--dict-samples", type=int, default=20_000, help="Passages sampled to train the dictionary")
+    parser.add_argument(
+        "--ledger",
+        default="",
+        help="Progress ledger written by build_jsonl_from_corpus_dbs.py; commits after each source and resumes on rerun",
+    )
+    parser.add_argument("--restart", action="store_true", help="With --ledger, rebuild the index from scratch")
+    args = parser.parse_args()
+    if args.shards < 1:
+        parser.error("--shards must be >= 1")
+    return args
+
+
+@dataclass
+class IngestStats:
+    counts: list[int]
+    raw_text_bytes: int = 0
+    stored_text_bytes: int = 0
+    # Passage ids seen twice in the input; only the first occurrence is indexed.
+    duplicates: list[str] = field(default_factory=list)
+
+
+def shard_path(db_path: Path, index: int, count: int) -> Path:
+    # Must match backend.app.retrieval.shard_paths.
+    return db_path.with_name(f"{db_path.stem}-{index:03d}-of-{count:03d}{db_path.suffix}")
+
+
+def shard_for(row: dict, shard_by: str, count: int) -> int:
+    if count == 1:
+        return 0
+    key = ""
+    if shard_by == "category":
+        key = str(row.get("category", "")).strip()
+    if not key:
+        key = f"{str(row.get('book_title_ar', '')).strip()}|{str(row.get('author_ar', '')).strip()}"
+    return zlib.crc32(key.encode("utf-8")) % count
 
 
 def create_schema(conn: sqlite3.Connection) -> None:
@@ -19,66 +82,285 @@ def create_schema(conn: sqlite3.Connection) -> None:
         """
         DROP TABLE IF EXISTS passages;
         DROP TABLE IF EXISTS passages_fts;
+        DROP TABLE IF EXISTS books;
+        DROP TABLE IF EXISTS authors;
+        DROP TABLE IF EXISTS index_meta;
+
+        CREATE TABLE authors (
+            id INTEGER PRIMARY KEY,
+            name_ar TEXT NOT NULL UNIQUE,
+            madhhab_ar TEXT
+        );
+
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY,
+            title_ar TEXT NOT NULL,
+            author_id INTEGER NOT NULL REFERENCES authors(id),
+            UNIQUE (title_ar, author_id)
+        );
 
+        -- Exactly one of text_ar / text_zst is set, depending on index_meta.text_codec.
         CREATE TABLE passages (
-            id TEXT PRIMARY KEY,
-            book_title_ar TEXT NOT NULL,
-            author_ar TEXT NOT NULL,
-            source_ref_ar TEXT NOT NULL,
+            pk INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            book_id INTEGER NOT NULL REFERENCES books(id),
             volume TEXT,
             page TEXT,
-            text_ar TEXT NOT NULL
+            char_start INTEGER,
+            char_end INTEGER,
+            text_ar TEXT,
+            text_zst BLOB
         );
 
+        CREATE TABLE index_meta (
+            key TEXT PRIMARY KEY,
+            value BLOB
+        );
+
+        -- Contentless: the text lives only in passages, FTS keeps just its index.
+        -- Metadata columns are indexed so filters are part of the MATCH expression.
         CREATE VIRTUAL TABLE passages_fts USING fts5(
-            id UNINDEXED,
             text_ar,
             book_title_ar,
             author_ar,
-            source_ref_ar,
+            madhhab_ar,
+            content = '',
             tokenize = 'unicode61 remove_diacritics 2'
         );
         """
     )
 
 
-def ingest_jsonl(conn: sqlite3.Connection, input_path: Path) -> int:
-    count = 0
+def resolve_madhhabs(input_path: Path) -> dict[str, str]:
+    """Map each author to the first non-empty madhhab_ar found anywhere in the export.
+
+    Contentless FTS rows cannot be updated, so an author's madhhab must be known
+    before their first passage is indexed, not filled in from a later row.
+    """
+    madhhabs: dict[str, str] = {}
     with input_path.open("r", encoding="utf-8") as f:
         for line in f:
-            line = line.strip()
-            if not line:
+            if '"madhhab_ar"' not in line:
                 continue
-
             row = json.loads(line)
-            pid = str(row["id"])
-            book_title_ar = str(row.get("book_title_ar", "")).strip()
             author_ar = str(row.get("author_ar", "")).strip()
-            source_ref_ar = str(row.get("source_ref_ar", "")).strip()
-            text_ar = str(row.get("text_ar", "")).strip()
-            volume = str(row.get("volume", "")).strip() or None
-            page = str(row.get("page", "")).strip() or None
+            madhhab_ar = str(row.get("madhhab_ar", "")).strip()
+            if author_ar and madhhab_ar:
+                madhhabs.setdefault(author_ar, madhhab_ar)
+    return madhhabs
+
+
+class Catalog:
+    """Assigns book and author ids once per build, so ids agree across shards.
+
+    An author's madhhab comes from `madhhabs` (see resolve_madhhabs) when given,
+    otherwise from the author's first row.
+    """
+
+    def __init__(self, madhhabs: dict[str, str] | None = None) -> None:
+        self.madhhabs = madhhabs or {}
+        self.authors: dict[str, tuple[int, str]] = {}
+        self.books: dict[tuple[str, int], int] = {}
+        self._dirty_authors: set[str] = set()
+        self._dirty_books: set[tuple[str, int]] = set()
+
+    @classmethod
+    def load(cls, conns: list[sqlite3.Connection], madhhabs: dict[str, str] | None = None) -> Catalog:
+        """Rebuild the catalog of a partial index; shards may differ if a run stopped between commits."""
+        catalog = cls(madhhabs)
+        for conn in conns:
+            for aid, name, madhhab in conn.execute("SELECT id, name_ar, coalesce(madhhab_ar, '') FROM authors"):
+                known = catalog.authors.get(name)
+                catalog.authors[name] = (aid, madhhab or (known[1] if known else ""))
+            for bid, title, author_id in conn.execute("SELECT id, title_ar, author_id FROM books"):
+                catalog.books[(title, author_id)] = bid
+        return catalog
+
+    def author_id(self, name_ar: str, madhhab_ar: str) -> int:
+        known = self.authors.get(name_ar)
+        if known is None:
+            known = self.authors[name_ar] = (len(self.authors) + 1, self.madhhabs.get(name_ar, madhhab_ar))
+            self._dirty_authors.add(name_ar)
+        return known[0]
+
+    def stale_madhhabs(self) -> list[str]:
+        """Authors already indexed under a different madhhab than the export now gives them."""
+        return [name for name, (_, madhhab) in self.authors.items() if self.madhhabs.get(name, "") != madhhab]
+
+    def madhhab(self, name_ar: str) -> str:
+        return self.authors[name_ar][1]
+
+    def book_id(self, title_ar: str, author_id: int) -> int:
+        key = (title_ar, author_id)
+        if key not in self.books:
+            self.books[key] = len(self.books) + 1
+            self._dirty_books.add(key)
+        return self.books[key]
+
+    def write(self, conns: list[sqlite3.Connection]) -> None:
+        """Write authors and books added or changed since the last write to every shard."""
+        authors = [(self.authors[name][0], name, self.authors[name][1] or None) for name in self._dirty_authors]
+        books = [(self.books[key], key[0], key[1]) for key in self._dirty_books]
+        for conn in conns:
+            conn.executemany("INSERT OR REPLACE INTO authors (id, name_ar, madhhab_ar) VALUES (?, ?, ?)", authors)
+            conn.executemany("INSERT OR REPLACE INTO books (id, title_ar, author_id) VALUES (?, ?, ?)", books)
+        self._dirty_authors.clear()
+        self._dirty_books.clear()
 
-            if not pid or not book_title_ar or not author_ar or not source_ref_ar or not text_ar:
+
+def train_text_dictionary(input_path: Path, dict_size: int, max_samples: int) -> bytes:
+    """Train a zstd dictionary on a uniform sample of passage texts."""
+    import zstandard
+
+    rng = random.Random(0)
+    samples: list[bytes] = []
+    seen = 0
+    with input_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
                 continue
+            text = str(json.loads(line).get("text_ar", "")).strip().encode("utf-8")
+            if not text:
+                continue
+            seen += 1
+            if len(samples) < max_samples:
+                samples.append(text)
+            else:
+                slot = rng.randrange(seen)
+                if slot < max_samples:
+                    samples[slot] = text
 
-            conn.execute(
-                """
-                INSERT INTO passages (id, book_title_ar, author_ar, source_ref_ar, volume, page, text_ar)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (pid, book_title_ar, author_ar, source_ref_ar, volume, page, text_ar),
-            )
-            conn.execute(
-                """
-                INSERT INTO passages_fts (id, text_ar, book_title_ar, author_ar, source_ref_ar)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (pid, text_ar, book_title_ar, author_ar, source_ref_ar),
-            )
-            count += 1
+    try:
+        return zstandard.train_dictionary(dict_size, samples).as_bytes()
+    except zstandard.ZstdError as exc:
+        raise SystemExit(f"Could not train a zstd dictionary from {len(samples)} passages ({exc}); use --compress none") from exc
+
+
+def read_zstd_dict(conn: sqlite3.Connection) -> bytes | None:
+    row = conn.execute("SELECT value FROM index_meta WHERE key = 'zstd_dict'").fetchone()
+    return bytes(row[0]) if row else None
+
+
+def write_meta(conn: sqlite3.Connection, text_codec: str, zstd_dict: bytes | None) -> None:
+    conn.execute("INSERT INTO index_meta (key, value) VALUES ('text_codec', ?)", (text_codec,))
+    if zstd_dict:
+        conn.execute("INSERT INTO index_meta (key, value) VALUES ('zstd_dict', ?)", (zstd_dict,))
+
+
+def ingest_jsonl(
+    conns: list[sqlite3.Connection],
+    input_path: Path,
+    catalog: Catalog,
+    shard_by: str = "book",
+    compressor=None,
+) -> IngestStats:
+    stats = IngestStats(counts=[0] * len(conns))
+    with input_path.open("r", encoding="utf-8") as f:
+        ingest_lines(conns, f, catalog, stats, shard_by=shard_by, compressor=compressor)
+    return stats
 
-    return count
+
+def ingest_lines(
+    conns: list[sqlite3.Connection],
+    lines: Iterable[str],
+    catalog: Catalog,
+    stats: IngestStats,
+    shard_by: str = "book",
+    compressor=None,
+    replay: bool = False,
+) -> None:
+    """Index JSONL passage lines.
+
+    With `replay`, the lines belong to a source that a stopped run may have
+    partly committed, so rows already present are skipped silently. Otherwise a
+    row whose id is already indexed is a duplicate and is recorded in `stats`.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        row = json.loads(line)
+        pid = str(row["id"])
+        book_title_ar = str(row.get("book_title_ar", "")).strip()
+        author_ar = str(row.get("author_ar", "")).strip()
+        madhhab_ar = str(row.get("madhhab_ar", "")).strip()
+        text_ar = str(row.get("text_ar", "")).strip()
+        volume = str(row.get("volume", "")).strip() or None
+        page = str(row.get("page", "")).strip() or None
+        char_start = row.get("char_start")
+        char_end = row.get("char_end")
+
+        if not pid or not book_title_ar or not author_ar or not text_ar:
+            continue
+
+        author_id = catalog.author_id(author_ar, madhhab_ar)
+        book_id = catalog.book_id(book_title_ar, author_id)
+
+        raw_text = text_ar.encode("utf-8")
+        text_zst = compressor.compress(raw_text) if compressor else None
+
+        shard = shard_for(row, shard_by, len(conns))
+        conn = conns[shard]
+        cursor = conn.execute(
+            """
+            INSERT OR IGNORE INTO passages (id, book_id, volume, page, char_start, char_end, text_ar, text_zst)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (pid, book_id, volume, page, char_start, char_end, None if text_zst else text_ar, text_zst),
+        )
+        if cursor.rowcount == 0:
+            if not replay:
+                stats.duplicates.append(pid)
+            continue
+        stats.raw_text_bytes += len(raw_text)
+        stats.stored_text_bytes += len(text_zst) if text_zst is not None else len(raw_text)
+        conn.execute(
+            """
+            INSERT INTO passages_fts (rowid, text_ar, book_title_ar, author_ar, madhhab_ar)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (cursor.lastrowid, text_ar, book_title_ar, author_ar, catalog.madhhab(author_ar)),
+        )
+        stats.counts[shard] += 1
+
+
+def ingest_from_ledger(
+    conns: list[sqlite3.Connection],
+    input_path: Path,
+    ledger: Ledger,
+    catalog: Catalog,
+    shard_by: str = "book",
+    compressor=None,
+    resuming: bool = False,
+) -> IngestStats:
+    """Index the export one source at a time, committing every shard and the ledger after each."""
+    stats = IngestStats(counts=[0] * len(conns))
+    pending = ledger.pending_index()
+    progress = Progress("index", len(pending), sum(row["out_end"] - row["out_start"] for row in pending))
+    with input_path.open("rb") as f:
+        for position, row in enumerate(pending):
+            f.seek(row["out_start"])
+            chunk = f.read(row["out_end"] - row["out_start"])
+            before = sum(stats.counts)
+            duplicates_before = len(stats.duplicates)
+            # split("\n"), not splitlines(): JSON strings may hold U+2028 and other line breaks unescaped.
+            lines = chunk.decode("utf-8").split("\n")
+            # Shards commit one after another, so only the first pending source can be partly indexed.
+            ingest_lines(
+                conns, lines, catalog, stats, shard_by=shard_by, compressor=compressor, replay=resuming and position == 0
+            )
+            catalog.write(conns)
+            for conn in conns:
+                conn.commit()
+            added = sum(stats.counts) - before
+            duplicates = len(stats.duplicates) - duplicates_before
+            if duplicates:
+                print(f"{row['path']}: {duplicates} duplicate passage ids skipped", file=sys.stderr)
+            ledger.record_indexed(row["path"], added, duplicates)
+            progress.advance(len(chunk), added)
+    return stats
 
 
 def main() -> None:
@@ -90,13 +372,95 @@ def main() -> None:
         raise SystemExit(f"Input file not found: {input_path}")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.shards == 1:
+        paths = [output_path]
+    else:
+        paths = [shard_path(output_path, i, args.shards) for i in range(args.shards)]
+
+    zstandard = None
+    if args.compress == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise SystemExit("--compress zstd requires the zstandard package (pip install zstandard)") from exc
+
+    ledger = None
+    resuming = False
+    if args.ledger:
+        ledger = Ledger(Path(args.ledger).resolve())
+        extract_config = ledger.config("extract")
+        if not extract_config or extract_config["output"] != str(input_path):
+            raise SystemExit(f"{args.ledger} does not record an extraction to {input_path}")
+        config = {
+            "input": str(input_path),
+            "output": str(output_path),
+            "shards": args.shards,
+            "shard_by": args.shard_by,
+            "compress": args.compress,
+            "zstd_level": args.zstd_level,
+        }
+        resuming = ledger.check_config("index", config, args.restart) and ledger.any_indexed()
+        missing = [path for path in paths if not path.exists()]
+        if resuming and missing:
+            raise SystemExit(f"Index shard not found: {missing[0]}; rerun with --restart")
 
-    with sqlite3.connect(str(output_path)) as conn:
-        create_schema(conn)
-        count = ingest_jsonl(conn, input_path)
-        conn.commit()
+    with ExitStack() as stack:
+        conns = [stack.enter_context(sqlite3.connect(str(path))) for path in paths]
+        madhhabs = resolve_madhhabs(input_path)
+        if resuming:
+            zstd_dict = read_zstd_dict(conns[0])
+            catalog = Catalog.load(conns, madhhabs)
+            stale = catalog.stale_madhhabs()
+            if stale:
+                raise SystemExit(
+                    f"madhhab_ar of {stale[0]} changed since their passages were indexed; rerun with --restart"
+                )
+            print(f"Resuming: {len(catalog.books)} books already indexed", file=sys.stderr)
+        else:
+            zstd_dict = None
+            if args.compress == "zstd":
+                zstd_dict = train_text_dictionary(input_path, args.dict_size, args.dict_samples)
+            for conn in conns:
+                create_schema(conn)
+                write_meta(conn, args.compress, zstd_dict)
+                conn.commit()
+            catalog = Catalog(madhhabs)
+
+        compressor = None
+        if zstandard:
+            compressor = zstandard.ZstdCompressor(level=args.zstd_level, dict_data=zstandard.ZstdCompressionDict(zstd_dict))
+
+        if ledger:
+            stats = ingest_from_ledger(
+                conns, input_path, ledger, catalog, shard_by=args.shard_by, compressor=compressor, resuming=resuming
+            )
+        else:
+            stats = ingest_jsonl(conns, input_path, catalog, shard_by=args.shard_by, compressor=compressor)
+            catalog.write(conns)
+        counts = []
+        for conn in conns:
+            conn.commit()
+            conn.execute("VACUUM")
+            counts.append(conn.execute("SELECT count(*) FROM passages").fetchone()[0])
 
-    print(f"Indexed {count} passages into {output_path}")
+    if ledger:
+        ledger.close()
+    for path, count in zip(paths, counts):
+        size_mb = path.stat().st_size / (1024 * 1024)
+        print(f"Indexed {count} passages into {path} ({size_mb:.1f} MB)")
+    print(f"Catalog: {len(catalog.books)} books by {len(catalog.authors)} authors")
+    if stats.duplicates:
+        shown = ", ".join(stats.duplicates[:10])
+        more = f" (+{len(stats.duplicates) - 10} more)" if len(stats.duplicates) > 10 else ""
+        print(f"Skipped {len(stats.duplicates)} passages with duplicate ids: {shown}{more}", file=sys.stderr)
+    if zstd_dict and stats.raw_text_bytes:
+        ratio = stats.raw_text_bytes / max(1, stats.stored_text_bytes)
+        print(
+            f"Text: {stats.raw_text_bytes / (1024 * 1024):.1f} MB raw -> "
+            f"{stats.stored_text_bytes / (1024 * 1024):.1f} MB zstd ({ratio:.2f}x, {len(zstd_dict) // 1024} KiB dictionary)"
+        )
+    if args.shards > 1:
+        print(f"Set NUSUS_DB_PATH={output_path} and NUSUS_DB_SHARDS={args.shards} to serve this sharded index.")
 
 
 if __name__ == "__main__":
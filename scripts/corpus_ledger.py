@@ -0,0 +1,196 @@
+"""Progress ledger shared by the corpus extraction and indexing steps.
+
+One row per source .db file records whether it was extracted, where its
+passages sit in the JSONL export (byte offsets), and whether that slice has
+been indexed. Reruns consult the ledger to resume instead of starting over.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+EXTRACTED = "extracted"
+FAILED = "failed"
+
+
+def file_sha256(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class Ledger:
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(str(path), isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                rows INTEGER NOT NULL DEFAULT 0,
+                pages INTEGER NOT NULL DEFAULT 0,
+                passages INTEGER NOT NULL DEFAULT 0,
+                out_start INTEGER,
+                out_end INTEGER,
+                extract_seconds REAL,
+                extracted_at REAL,
+                indexed_passages INTEGER,
+                indexed_duplicates INTEGER,
+                indexed_at REAL
+            );
+            """
+        )
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(sources)")}
+        if "indexed_duplicates" not in columns:
+            self.conn.execute("ALTER TABLE sources ADD COLUMN indexed_duplicates INTEGER")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def check_config(self, stage: str, config: dict, restart: bool) -> bool:
+        """Return True when the stage resumes; raise when its settings changed since the last run."""
+        key = f"{stage}_config"
+        value = json.dumps(config, sort_keys=True)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row and row["value"] != value and not restart:
+            raise SystemExit(
+                f"{stage} settings differ from the run recorded in {self.path}; "
+                "rerun with --restart to start this step over"
+            )
+        resuming = bool(row) and not restart
+        if restart:
+            self.reset(stage)
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        return resuming
+
+    def config(self, stage: str) -> dict | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (f"{stage}_config",)).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def reset(self, stage: str) -> None:
+        if stage == "extract":
+            # A new export moves every offset, so indexing starts over as well.
+            self.conn.execute("DELETE FROM sources")
+            self.conn.execute("DELETE FROM meta WHERE key = 'index_config'")
+        else:
+            self.conn.execute("UPDATE sources SET indexed_passages = NULL, indexed_duplicates = NULL, indexed_at = NULL")
+
+    def sources(self) -> dict[str, sqlite3.Row]:
+        return {row["path"]: row for row in self.conn.execute("SELECT * FROM sources")}
+
+    def committed_offset(self) -> int:
+        row = self.conn.execute("SELECT coalesce(max(out_end), 0) FROM sources WHERE status = ?", (EXTRACTED,)).fetchone()
+        return int(row[0])
+
+    def record_extracted(
+        self,
+        source: str,
+        size: int,
+        mtime_ns: int,
+        sha256: str,
+        rows: int,
+        pages: int,
+        passages: int,
+        out_start: int,
+        out_end: int,
+        seconds: float,
+        error: str | None = None,
+    ) -> None:
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO sources (
+                path, size, mtime_ns, sha256, status, error, rows, pages, passages,
+                out_start, out_end, extract_seconds, extracted_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (source, size, mtime_ns, sha256, EXTRACTED, error, rows, pages, passages, out_start, out_end, seconds, time.time()),
+        )
+
+    def record_failed(self, source: str, size: int, mtime_ns: int, sha256: str, error: str, seconds: float) -> None:
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO sources (path, size, mtime_ns, sha256, status, error, extract_seconds, extracted_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (source, size, mtime_ns, sha256, FAILED, error, seconds, time.time()),
+        )
+
+    def failures(self) -> list[sqlite3.Row]:
+        return self.conn.execute("SELECT path, error FROM sources WHERE status = ? ORDER BY path", (FAILED,)).fetchall()
+
+    def any_indexed(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM sources WHERE indexed_at IS NOT NULL LIMIT 1").fetchone() is not None
+
+    def pending_index(self) -> list[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT * FROM sources WHERE status = ? AND indexed_at IS NULL AND out_end > out_start ORDER BY out_start",
+            (EXTRACTED,),
+        ).fetchall()
+
+    def record_indexed(self, source: str, passages: int, duplicates: int = 0) -> None:
+        self.conn.execute(
+            "UPDATE sources SET indexed_passages = ?, indexed_duplicates = ?, indexed_at = ? WHERE path = ?",
+            (passages, duplicates, time.time(), source),
+        )
+
+
+class Progress:
+    """Throughput and ETA printed at most every `interval` seconds, weighted by bytes."""
+
+    def __init__(self, label: str, total_items: int, total_bytes: int, interval: float = 5.0):
+        self.label = label
+        self.total_items = total_items
+        self.total_bytes = max(1, total_bytes)
+        self.interval = interval
+        self.items = 0
+        self.bytes = 0
+        self.passages = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def advance(self, size: int, passages: int = 0) -> None:
+        self.items += 1
+        self.bytes += size
+        self.passages += passages
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval or self.items == self.total_items:
+            self._last_report = now
+            self.report(now)
+
+    def report(self, now: float | None = None) -> None:
+        elapsed = max(1e-9, (now or time.perf_counter()) - self.started)
+        rate = self.bytes / elapsed
+        eta = (self.total_bytes - self.bytes) / rate if rate else 0.0
+        print(
+            f"[{self.label}] {self.items}/{self.total_items} sources, "
+            f"{rate / (1024 * 1024):.1f} MB/s, {self.passages / elapsed:.0f} passages/s, "
+            f"elapsed {format_duration(elapsed)}, ETA {format_duration(eta)}",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{secs:02d}s"
@@ -6,6 +6,7 @@ ISO_PATH="${1:-$REPO_DIR/data/raw/corpus.iso}"
 WORK_DIR="$REPO_DIR/data/full_corpus"
 EXTRACT_DIR="$WORK_DIR/extracted"
 JSONL_PATH="$WORK_DIR/corpus_export.jsonl"
+LEDGER_PATH="$WORK_DIR/ledger.sqlite"
 SQLITE_PATH="$REPO_DIR/data/corpus.sqlite"
 
 if [[ ! -f "$ISO_PATH" ]]; then
@@ -45,16 +46,36 @@ if ! 7zz t -p"$CORPUS_ARCHIVE_PASSWORD" "$ARCHIVE_PATH" "database/book/001/1.db"
   exit 1
 fi
 
-echo "[3/5] Extracting database files (this can take a long time)..."
-7zz x -bb0 -y -p"$CORPUS_ARCHIVE_PASSWORD" "$ARCHIVE_PATH" "database/*" -o"$EXTRACT_DIR" >/tmp/nusus_extract.log 2>&1
+# Steps 3-5 resume after an interruption: extraction is skipped once it has completed,
+# and the JSONL export and index pick up from the ledger. Set RESTART=1 to start over.
+RESTART_FLAG=()
+if [[ "${RESTART:-0}" == "1" ]]; then
+  rm -f "$EXTRACT_DIR/.complete"
+  RESTART_FLAG=(--restart)
+fi
+
+if [[ -f "$EXTRACT_DIR/.complete" ]]; then
+  echo "[3/5] Database files already extracted; skipping."
+else
+  echo "[3/5] Extracting database files (this can take a long time)..."
+  7zz x -bb0 -y -p"$CORPUS_ARCHIVE_PASSWORD" "$ARCHIVE_PATH" "database/*" -o"$EXTRACT_DIR" >/tmp/nusus_extract.log 2>&1
+  touch "$EXTRACT_DIR/.complete"
+fi
 
 echo "[4/5] Converting extracted .db files to JSONL..."
 python3 "$REPO_DIR/scripts/build_jsonl_from_corpus_dbs.py" \
   --db-root "$EXTRACT_DIR/database/book" \
-  --output "$JSONL_PATH"
+  --output "$JSONL_PATH" \
+  --ledger "$LEDGER_PATH" \
+  ${RESTART_FLAG[@]+"${RESTART_FLAG[@]}"}
 
 echo "[5/5] Building search index sqlite..."
-python3 "$REPO_DIR/scripts/build_sqlite_from_jsonl.py" --input "$JSONL_PATH" --output "$SQLITE_PATH"
+python3 "$REPO_DIR/scripts/build_sqlite_from_jsonl.py" \
+  --input "$JSONL_PATH" \
+  --output "$SQLITE_PATH" \
+  --ledger "$LEDGER_PATH" \
+  ${RESTART_FLAG[@]+"${RESTART_FLAG[@]}"}
 
 echo "Done."
 echo "Index ready at: $SQLITE_PATH"
+echo "Per-source status, row counts and failures: $LEDGER_PATH"
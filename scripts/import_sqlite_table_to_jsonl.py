@@ -14,10 +14,11 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--id-col", required=True, help="ID column")
     parser.add_argument("--book-col", required=True, help="Arabic book title column")
     parser.add_argument("--author-col", required=True, help="Arabic author column")
-    parser.add_argument("--source-col", required=True, help="Arabic source reference column")
+    parser.add_argument("--source-col", default="", help="Arabic source reference column (optional, informational)")
     parser.add_argument("--text-col", required=True, help="Arabic passage text column")
     parser.add_argument("--volume-col", default="", help="Volume column (optional)")
     parser.add_argument("--page-col", default="", help="Page column (optional)")
+    parser.add_argument("--madhhab-col", default="", help="Author madhhab column (optional)")
     parser.add_argument("--where", default="", help="Optional SQL WHERE clause")
     parser.add_argument("--limit", type=int, default=0, help="Optional row limit")
     parser.add_argument("--output", required=True, help="Output JSONL path")
@@ -32,11 +33,10 @@ def main() -> None:
     if not db_path.exists():
         raise SystemExit(f"Database not found: {db_path}")
 
-    cols = [args.id_col, args.book_col, args.author_col, args.source_col, args.text_col]
-    if args.volume_col:
-        cols.append(args.volume_col)
-    if args.page_col:
-        cols.append(args.page_col)
+    cols = [args.id_col, args.book_col, args.author_col, args.text_col]
+    for optional_col in [args.source_col, args.volume_col, args.page_col, args.madhhab_col]:
+        if optional_col:
+            cols.append(optional_col)
 
     select_cols = ", ".join(cols)
     query = f"SELECT {select_cols} FROM {args.table}"
@@ -56,13 +56,14 @@ def main() -> None:
                 "id": str(row[args.id_col]),
                 "book_title_ar": str(row[args.book_col] or "").strip(),
                 "author_ar": str(row[args.author_col] or "").strip(),
-                "source_ref_ar": str(row[args.source_col] or "").strip(),
+                "source_ref_ar": str(row[args.source_col] or "").strip() if args.source_col else "",
                 "text_ar": str(row[args.text_col] or "").strip(),
                 "volume": str(row[args.volume_col] or "").strip() if args.volume_col else "",
                 "page": str(row[args.page_col] or "").strip() if args.page_col else "",
+                "madhhab_ar": str(row[args.madhhab_col] or "").strip() if args.madhhab_col else "",
             }
 
-            if not all([item["id"], item["book_title_ar"], item["author_ar"], item["source_ref_ar"], item["text_ar"]]):
+            if not all([item["id"], item["book_title_ar"], item["author_ar"], item["text_ar"]]):
                 continue
 
             out.write(json.dumps(item, ensure_ascii=False) + "\n")
@@ -6,10 +6,21 @@ from pathlib import Path
 
 
 SAMPLE_ROWS = [
+    # No madhhab_ar: the builder takes it from the author's later row, so madhhab filters still find this passage.
+    {
+        "id": "mughni-4-3",
+        "book_title_ar": "المغني",
+        "author_ar": "ابن قدامة",
+        "source_ref_ar": "المغني، ج4، ص3",
+        "volume": "4",
+        "page": "3",
+        "text_ar": "البيع مبادلة المال بالمال تمليكاً وتملكاً، وهو جائز بالكتاب والسنة والإجماع.",
+    },
     {
         "id": "mughni-1-45",
         "book_title_ar": "المغني",
         "author_ar": "ابن قدامة",
+        "madhhab_ar": "حنبلي",
         "source_ref_ar": "المغني، ج1، ص45",
         "volume": "1",
         "page": "45",
@@ -19,6 +30,7 @@ SAMPLE_ROWS = [
         "id": "majmoo-3-112",
         "book_title_ar": "المجموع",
         "author_ar": "النووي",
+        "madhhab_ar": "شافعي",
         "source_ref_ar": "المجموع، ج3، ص112",
         "volume": "3",
         "page": "112",
@@ -28,6 +40,7 @@ SAMPLE_ROWS = [
         "id": "fath-2-97",
         "book_title_ar": "فتح الباري",
         "author_ar": "ابن حجر",
+        "madhhab_ar": "شافعي",
         "source_ref_ar": "فتح الباري، ج2، ص97",
         "volume": "2",
         "page": "97",
@@ -37,6 +50,7 @@ SAMPLE_ROWS = [
         "id": "bidaya-2-166",
         "book_title_ar": "بداية المجتهد",
         "author_ar": "ابن رشد",
+        "madhhab_ar": "مالكي",
         "source_ref_ar": "بداية المجتهد، ج2، ص166",
         "volume": "2",
         "page": "166",
@@ -46,6 +60,7 @@ SAMPLE_ROWS = [
         "id": "umm-3-25",
         "book_title_ar": "الأم",
         "author_ar": "الشافعي",
+        "madhhab_ar": "شافعي",
         "source_ref_ar": "الأم، ج3، ص25",
         "volume": "3",
         "page": "25",